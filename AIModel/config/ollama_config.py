@@ -0,0 +1,26 @@
+import os
+
+
+class OllamaConfig:
+    # Ollama host used by the chat, vision and health endpoints
+    LLAMA_URL = os.getenv("LLAMA_URL", "http://127.0.0.1:11434")
+
+    # Shared client connection pool
+    MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "16"))
+    KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "120"))
+
+    # Timeouts (seconds). Read timeout is generous because generation streams can pause.
+    CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+    WRITE_TIMEOUT = float(os.getenv("OLLAMA_WRITE_TIMEOUT", "60"))
+    POOL_TIMEOUT = float(os.getenv("OLLAMA_POOL_TIMEOUT", "30"))
+
+    # Vision model discovery (preferred order, then any llava/vision-like model)
+    VISION_MODELS = [
+        m.strip() for m in os.getenv(
+            "OLLAMA_VISION_MODELS", "llava:13b,llava:7b,llama3.2-vision,bakllava"
+        ).split(",") if m.strip()
+    ]
+    VISION_MODEL_KEYWORDS = ["llava", "vision", "bakllava"]
+    MODEL_CATALOG_TTL = float(os.getenv("OLLAMA_MODEL_CATALOG_TTL", "60"))
@@ -0,0 +1,102 @@
+import os
+
+
+class RAGConfig:
+    # Concurrency: at most this many RAG requests retrieve/generate at once,
+    # and blocking vector-store work runs on a dedicated bounded thread pool.
+    MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "4"))
+    EXECUTOR_WORKERS = int(os.getenv("RAG_EXECUTOR_WORKERS", "4"))
+
+    # Cached vector-store counters are re-synced with Chroma this often (seconds)
+    STATS_RECONCILE_INTERVAL = float(os.getenv("RAG_STATS_RECONCILE_INTERVAL", "300"))
+
+    # Vector store
+    COLLECTION_NAME = os.getenv("RAG_COLLECTION_NAME", "company_data")
+    PERSIST_DIRECTORY = os.getenv("RAG_PERSIST_DIRECTORY", "./chroma_db")
+    # "chroma" (HNSW in SQLite) or "numpy": an exact brute-force search over a
+    # memory-mapped float16 matrix, faster than HNSW for corpora under ~100k chunks
+    VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma").lower()
+    # HNSW parameters for newly created Chroma collections (defaults are Chroma's own).
+    # They are fixed per collection: change them with an index migration, and pick
+    # them with scripts/benchmark_hnsw.py
+    HNSW_M = int(os.getenv("RAG_HNSW_M", "16"))
+    HNSW_CONSTRUCTION_EF = int(os.getenv("RAG_HNSW_CONSTRUCTION_EF", "100"))
+    HNSW_SEARCH_EF = int(os.getenv("RAG_HNSW_SEARCH_EF", "10"))
+
+    # Dedicated embedding model (served by Ollama); the chat model stays llama3.
+    # Switching models requires re-embedding the collection: the dimension guard
+    # refuses to mix vectors of different widths. Unset, the model recorded on the
+    # live collection is used (llama3 for collections written before it was
+    # recorded); only new, empty collections get DEFAULT_EMBEDDING_MODEL.
+    EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL") or None
+    DEFAULT_EMBEDDING_MODEL = os.getenv("RAG_DEFAULT_EMBEDDING_MODEL", "nomic-embed-text")
+    LEGACY_EMBEDDING_MODEL = "llama3"
+
+    # Chunking (the live values are tracked per collection by IndexRegistry)
+    CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
+    CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+
+    # Extracted source text is kept so collections can be rebuilt without re-uploads
+    SOURCE_TEXT_DIRECTORY = os.getenv("RAG_SOURCE_TEXT_DIRECTORY", "./rag_sources")
+
+    # Background re-embedding / index migration throttling
+    MIGRATION_BATCH_SIZE = int(os.getenv("RAG_MIGRATION_BATCH_SIZE", "16"))
+    MIGRATION_BATCH_DELAY = float(os.getenv("RAG_MIGRATION_BATCH_DELAY", "0.5"))
+    # Pause between batches while chat RAG requests are in flight (up to this many seconds)
+    MIGRATION_MAX_YIELD_SECONDS = float(os.getenv("RAG_MIGRATION_MAX_YIELD_SECONDS", "10"))
+
+    # Query-embedding LRU cache (keyed by normalized query text + embedding model)
+    QUERY_EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("RAG_QUERY_EMBEDDING_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("RAG_QUERY_EMBEDDING_CACHE_TTL", "0"))  # 0 = no expiry
+
+    # Micro-batching of query embeddings across concurrent requests
+    EMBED_BATCH_WINDOW_MS = float(os.getenv("RAG_EMBED_BATCH_WINDOW_MS", "8"))
+    EMBED_MAX_BATCH = int(os.getenv("RAG_EMBED_MAX_BATCH", "16"))
+
+    # Retrieval: "vector" (embeddings only), "hybrid" (BM25 + vector, reciprocal-rank
+    # fused) or "lexical" (BM25 only, no embedding call at all)
+    RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").lower()
+    # Upper bound on chunks stuffed into the prompt (the actual k is chosen per query)
+    RETRIEVAL_TOP_K = int(os.getenv("RAG_RETRIEVAL_TOP_K", "5"))
+    # Candidates taken from each retriever before fusion
+    HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+    RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+    # Score-aware context selection: chunks below this cosine similarity, or this far
+    # below the best hit, are dropped; the rest are added until the token budget is used
+    RELEVANCE_THRESHOLD = float(os.getenv("RAG_RELEVANCE_THRESHOLD", "0.5"))
+    RELEVANCE_MARGIN = float(os.getenv("RAG_RELEVANCE_MARGIN", "0.15"))
+    # A BM25 hit scoring at least this fraction of the best BM25 hit is kept even when
+    # its cosine similarity misses the threshold (same rule in every retrieval mode)
+    LEXICAL_RELEVANCE_THRESHOLD = float(os.getenv("RAG_LEXICAL_RELEVANCE_THRESHOLD", "0.5"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+
+    # Post-retrieval diversification: MMR trade-off (1.0 = relevance only), the number of
+    # vector candidates it chooses from, and the similarity above which two chunks count
+    # as duplicates (re-uploads) and only the better one is kept
+    MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+    MMR_FETCH_K = int(os.getenv("RAG_MMR_FETCH_K", "12"))
+    DUPLICATE_SIMILARITY = float(os.getenv("RAG_DUPLICATE_SIMILARITY", "0.97"))
+
+    # Per-tenant collection sharding: chunks with a tenant_id live in their own
+    # "{collection}__t_{tenant}" collection, created on first ingest; at most this
+    # many shard handles are kept open (LRU)
+    TENANT_SHARDING = os.getenv("RAG_TENANT_SHARDING", "false").lower() == "true"
+    MAX_OPEN_COLLECTIONS = int(os.getenv("RAG_MAX_OPEN_COLLECTIONS", "32"))
+
+    # Two-level retrieval: pick the nearest documents by centroid ("{collection}__docs"),
+    # then search chunks only within them; used once the corpus has this many documents
+    HIERARCHICAL_RETRIEVAL = os.getenv("RAG_HIERARCHICAL_RETRIEVAL", "true").lower() == "true"
+    HIERARCHICAL_MIN_DOCUMENTS = int(os.getenv("RAG_HIERARCHICAL_MIN_DOCUMENTS", "50"))
+    HIERARCHICAL_TOP_DOCUMENTS = int(os.getenv("RAG_HIERARCHICAL_TOP_DOCUMENTS", "8"))
+
+    # Quantized first-stage search: "none", "int8" or "fp16" vectors scanned first
+    # (4x / 2x smaller than float32). Chroma gets an index beside each collection and
+    # the top k * factor int8 candidates are re-scored against Chroma's own vectors;
+    # the numpy backend stores new collections as int8 instead of float16
+    VECTOR_QUANTIZATION = os.getenv("RAG_VECTOR_QUANTIZATION", "none").lower()
+    QUANTIZED_RESCORE_FACTOR = int(os.getenv("RAG_QUANTIZED_RESCORE_FACTOR", "4"))
+
+    # Dimension reduction (PCA / Matryoshka truncation): at most this many stored
+    # vectors are used to fit a projection or build a recall-vs-dimension report
+    PROJECTION_FIT_SAMPLE = int(os.getenv("RAG_PROJECTION_FIT_SAMPLE", "20000"))
@@ -0,0 +1,38 @@
+import os
+
+
+class VisionConfig:
+    # Image download
+    IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
+    # Downloads are aborted as soon as they stream past this size
+    MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+
+    # How images reach Ollama: "memory" sends base64 bytes in the chat call,
+    # "file" writes a temporary file and passes its path (legacy behaviour)
+    IMAGE_HANDOFF_MODE = os.getenv("IMAGE_HANDOFF_MODE", "memory").lower()
+
+    # Content-addressed image cache
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    # Within this window a cached image is reused without contacting the origin;
+    # after it, the cache revalidates with ETag / If-Modified-Since.
+    IMAGE_CACHE_FRESH_SECONDS = float(os.getenv("IMAGE_CACHE_FRESH_SECONDS", "600"))
+
+    # Preprocessing before vision inference (requires Pillow)
+    IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+    # Longest side sent to the model; llava re-scales internally to roughly this size
+    IMAGE_TARGET_SIZE = int(os.getenv("IMAGE_TARGET_SIZE", "672"))
+    IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG").upper()
+    IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "85"))
+    # Optional tiling of very large images: an overview plus up to N tiles
+    IMAGE_TILING_ENABLED = os.getenv("IMAGE_TILING_ENABLED", "false").lower() == "true"
+    IMAGE_TILE_THRESHOLD = float(os.getenv("IMAGE_TILE_THRESHOLD", "3"))  # x target size
+    IMAGE_MAX_TILES = int(os.getenv("IMAGE_MAX_TILES", "4"))
+    IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+    IMAGE_PREPROCESS_CACHE_SIZE = int(os.getenv("IMAGE_PREPROCESS_CACHE_SIZE", "64"))
+
+    # Follow-up turns: answer from a cached image description with the text model
+    FOLLOW_UP_TEXT_MODE = os.getenv("FOLLOW_UP_TEXT_MODE", "true").lower() == "true"
+    FOLLOW_UP_TEXT_MODEL = os.getenv("FOLLOW_UP_TEXT_MODEL", "llama3")
+    IMAGE_DESCRIPTION_CACHE_SIZE = int(os.getenv("IMAGE_DESCRIPTION_CACHE_SIZE", "256"))
+
+    SUPPORTED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp']
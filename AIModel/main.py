@@ -10,16 +10,40 @@ from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from ollama import AsyncClient
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
-import httpx
 import tempfile
+import base64
+
+load_dotenv()
+
+from services.ollama_connection import OllamaConnectionManager
+from services.model_catalog import OllamaModelCatalog
+from config.vision_config import VisionConfig
+
+# ✅ Optional image pipeline (download cache, preprocessing, follow-up descriptions)
+try:
+    from services.image_cache import ImageCache, ImageDownloadError, ImageTooLargeError
+    from services.image_preprocessor import ImagePreprocessor
+    from services.image_descriptions import ImageDescriptionStore
+    HAS_IMAGE_PIPELINE = True
+except ImportError as e:
+    print(f"⚠️ Warning: Could not import image pipeline: {e}")
+    print("📝 Image analysis will be disabled, but chat will still work")
+    HAS_IMAGE_PIPELINE = False
+    ImageCache = None
+    ImagePreprocessor = None
+    ImageDescriptionStore = None
+    ImageDownloadError = ImageTooLargeError = Exception
 
 # ✅ FIXED: Add proper error handling for optional RAG services
 try:
-    from services.model_manager import ModelManager
+    from services.model_manager import ModelManager, NO_DOCUMENTS_MESSAGE
     from services.training_service import IngestionService
+    from services.index_migration import IndexMigrationService
+    from services.retrieval_scope import SessionScopeStore
+    from config.rag_config import RAGConfig
     HAS_RAG_SERVICES = True
     print("✅ RAG services imported successfully")
 except ImportError as e:
@@ -27,9 +51,11 @@ except ImportError as e:
     print("📝 RAG features will be disabled, but chat will still work")
     HAS_RAG_SERVICES = False
     ModelManager = None
+    NO_DOCUMENTS_MESSAGE = None
     IngestionService = None
-
-load_dotenv()
+    IndexMigrationService = None
+    SessionScopeStore = None
+    RAGConfig = None
 
 LLAMA_URL = os.getenv("LLAMA_URL", "http://127.0.0.1:11434")
 NODE_BACKEND_URL = os.getenv("NODE_BACKEND_URL", "http://localhost:3000")
@@ -37,6 +63,7 @@ NODE_BACKEND_URL = os.getenv("NODE_BACKEND_URL", "http://localhost:3000")
 # ✅ FIXED: Initialize RAG services with proper error handling
 model_manager = None
 ingestion_service = None
+index_migration_service = None
 
 if HAS_RAG_SERVICES:
     try:
@@ -44,9 +71,20 @@ if HAS_RAG_SERVICES:
         model_manager = ModelManager()
         print("✅ ModelManager created")
         
-        ingestion_service = IngestionService(model_manager.get_embedding_model())
+        ingestion_service = IngestionService(
+            model_manager.get_embedding_model(),
+            vector_stats=model_manager.vector_stats,
+            index_registry=model_manager.index_registry,
+            lexical_index=model_manager.lexical_index,
+            collection_router=model_manager.collection_router,
+            document_index=model_manager.document_index,
+            quantized_index=model_manager.quantized_index,
+            vector_service=model_manager.vector_service
+        )
         print("✅ IngestionService created")
         
+        index_migration_service = IndexMigrationService(model_manager, ingestion_service)
+        
         print("✅ RAG services initialized successfully")
     except Exception as e:
         print(f"❌ RAG initialization failed: {e}")
@@ -57,11 +95,50 @@ if HAS_RAG_SERVICES:
         print("📝 RAG features will be disabled, but chat will still work")
         model_manager = None
         ingestion_service = None  # ← This is why it's None!
+        index_migration_service = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Nexus AI FastAPI Server", version="1.0.0")
+# ✅ One pooled Ollama client shared by every endpoint
+ollama_connection = OllamaConnectionManager(host=LLAMA_URL)
+model_catalog = OllamaModelCatalog(ollama_connection)
+image_cache = ImageCache() if HAS_IMAGE_PIPELINE else None
+image_preprocessor = ImagePreprocessor() if HAS_IMAGE_PIPELINE else None
+image_descriptions = ImageDescriptionStore() if HAS_IMAGE_PIPELINE else None
+session_scopes = SessionScopeStore() if HAS_RAG_SERVICES else None  # Per-session RAG document/tenant scope
+
+async def reconcile_vector_stats_loop():
+    """Periodically correct the cached vector-store counters against Chroma"""
+    while True:
+        await asyncio.sleep(RAGConfig.STATS_RECONCILE_INTERVAL)
+        try:
+            await model_manager.areconcile_vector_stats()
+        except Exception as e:
+            logger.warning(f"⚠️ Vector stats reconcile failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ollama_connection.start()
+    await model_catalog.start()
+    stats_task = asyncio.create_task(reconcile_vector_stats_loop()) if model_manager else None
+    try:
+        yield
+    finally:
+        if stats_task:
+            stats_task.cancel()
+        await model_catalog.close()
+        if image_cache:
+            await image_cache.close()
+        if image_preprocessor:
+            image_preprocessor.close()
+        await ollama_connection.close()
+        if index_migration_service:
+            await index_migration_service.close()
+        if model_manager:
+            model_manager.close()
+
+app = FastAPI(title="Nexus AI FastAPI Server", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -109,6 +186,28 @@ class EnhancedChatRequest(BaseModel):
     isFollowUpMessage: Optional[bool] = False
     hasImageContext: Optional[bool] = False
     imageUrl: Optional[str] = None
+    # Retrieval scope: restrict RAG to these documents / this tenant (remembered per session)
+    docIds: Optional[List[str]] = None
+    tenantId: Optional[str] = None
+
+class IndexMigrationRequest(BaseModel):
+    embedding_model: Optional[str] = None
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
+    drop_old_collection: Optional[bool] = False
+    # Dimension reduction for the new collection: "pca" or "truncate" (Matryoshka embedders)
+    projection: Optional[str] = None
+    projection_dimension: Optional[int] = None
+    # HNSW index of the new collection (defaults: RAG_HNSW_*); see scripts/benchmark_hnsw.py
+    hnsw_m: Optional[int] = None
+    hnsw_construction_ef: Optional[int] = None
+    hnsw_search_ef: Optional[int] = None
+
+class ProjectionReportRequest(BaseModel):
+    projection: Optional[str] = "pca"
+    dimensions: Optional[List[int]] = [64, 128, 256, 512, 768]
+    k: Optional[int] = 10
+    sample: Optional[int] = 200
 
 class IntentRequest(BaseModel):
     message: str
@@ -136,9 +235,10 @@ async def health_check():
         # ✅ Check Ollama connection
         ollama_status = "unknown"
         try:
-            client = AsyncClient(host=LLAMA_URL)
+            client = ollama_connection.get_client()
             response = await client.list()
             ollama_status = "online" if response else "offline"
+            model_catalog.update_from_list(response)
         except Exception as e:
             logger.warning(f"Ollama check failed: {e}")
             ollama_status = "offline"
@@ -171,6 +271,13 @@ async def rag_health_check():
             "rag_services": HAS_RAG_SERVICES,
             "model_manager": model_manager is not None,
             "ingestion_service": ingestion_service is not None,
+            "vector_store": model_manager.vector_stats.snapshot() if model_manager else None,
+            "query_embedding_cache": model_manager.query_embedding_cache.stats() if model_manager else None,
+            "query_embedding_batches": model_manager.embedding_batcher.stats() if model_manager else None,
+            "vector_backend": RAGConfig.VECTOR_BACKEND if RAGConfig else None,
+            "retrieval_mode": RAGConfig.RETRIEVAL_MODE if RAGConfig else None,
+            "lexical_index_chunks": model_manager.lexical_index.chunk_count if model_manager else None,
+            "quantized_index": model_manager.quantized_index.stats() if model_manager and model_manager.quantized_index else None,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -189,6 +296,7 @@ async def vector_health_check():
         return {
             "status": "online" if model_manager else "offline",
             "vector_db": "embedded" if model_manager else "unavailable",
+            "stats": model_manager.vector_stats.snapshot() if model_manager else None,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -198,6 +306,57 @@ async def vector_health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+def cleanup_temp_images(temp_image_paths: List[str]):
+    """Remove vision temp files (only created in the "file" hand-off mode)"""
+    for temp_image_path in temp_image_paths:
+        try:
+            os.unlink(temp_image_path)
+            logger.info("🗑️ [VISION] Cleaned up temporary image file")
+        except Exception as cleanup_error:
+            logger.warning(f"⚠️ [VISION] Could not clean up temp file: {cleanup_error}")
+
+def stream_image_follow_up(request: EnhancedChatRequest, image_name: str, description: str) -> StreamingResponse:
+    """Answer a follow-up question about an image from its cached description (text model only)"""
+    messages = [{
+        "role": "system",
+        "content": f"""You are a helpful AI assistant answering questions about an image the user shared ({image_name}).
+You cannot see the image directly, but here is a detailed description of it:
+
+{description}
+
+Answer using this description. If the description does not contain the answer, say so honestly."""
+    }]
+    
+    if request.conversation_context:
+        for msg in request.conversation_context[-5:]:
+            if hasattr(msg, 'role') and hasattr(msg, 'content'):
+                messages.append({"role": msg.role, "content": msg.content})
+    
+    messages.append({"role": "user", "content": request.message})
+    
+    async def stream_follow_up_response():
+        try:
+            client = ollama_connection.get_client()
+            stream = await client.chat(
+                model=VisionConfig.FOLLOW_UP_TEXT_MODEL,
+                messages=messages,
+                stream=True,
+                options={"temperature": 0.5, "top_p": 0.9, "num_predict": 1000}
+            )
+            chunk_count = 0
+            async for chunk in stream:
+                if chunk and 'message' in chunk:
+                    content = chunk['message'].get('content', '')
+                    if content:
+                        chunk_count += 1
+                        yield content
+            logger.info(f"✅ [FOLLOW-UP] Completed - {chunk_count} chunks")
+        except Exception as stream_error:
+            logger.error(f"❌ [FOLLOW-UP] Stream error: {stream_error}")
+            yield f"\n\n❌ Image follow-up error: {str(stream_error)}"
+    
+    return StreamingResponse(stream_follow_up_response(), media_type="text/plain")
+
 # ✅ FIXED: ROBUST CHAT ENDPOINT
 @app.post("/chat")
 async def enhanced_chat_endpoint(request: EnhancedChatRequest):
@@ -267,32 +426,69 @@ async def enhanced_chat_endpoint(request: EnhancedChatRequest):
             logger.info(f"  - Image Name: {image_name}")
             logger.info(f"  - Message: {request.message}")
             
+            if not HAS_IMAGE_PIPELINE:
+                logger.error("❌ [VISION] Image pipeline not available")
+                return StreamingResponse(
+                    iter(["❌ Image analysis is not available on this server (the image pipeline failed to import)."]),
+                    media_type="text/plain"
+                )
+            
+            temp_image_paths = []
             try:
-                # ✅ STEP 1: Download image to temporary file
-                logger.info("📥 [VISION] Downloading image to local file...")
+                # ✅ FOLLOW-UP: answer from the cached description with the cheaper text model (no download)
+                is_follow_up = bool(request.isFollowUpMessage) or request.type != "image"
+                if VisionConfig.FOLLOW_UP_TEXT_MODE and is_follow_up:
+                    description = image_descriptions.get_for_url(image_url) or request.imageAnalysis
+                    if description and not image_descriptions.needs_visual_detail(request.message, description):
+                        logger.info(f"📝 [FOLLOW-UP] Answering from image description with {VisionConfig.FOLLOW_UP_TEXT_MODEL}")
+                        return stream_image_follow_up(request, image_name, description)
+                    logger.info("🔍 [FOLLOW-UP] No usable description or visual detail needed, using vision model")
                 
-                async with httpx.AsyncClient(timeout=30.0) as http_client:
-                    image_response = await http_client.get(image_url)
-                    
-                    if image_response.status_code != 200:
-                        logger.error(f"❌ [VISION] Failed to download image: HTTP {image_response.status_code}")
-                        return StreamingResponse(
-                            iter([f"❌ Could not download image from URL. HTTP status: {image_response.status_code}"]),
-                            media_type="text/plain"
-                        )
-                    
-                    # Create temporary file with appropriate extension
-                    file_extension = image_url.split('.')[-1].split('?')[0] or 'jpg'
-                    if file_extension not in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp']:
+                # ✅ STEP 1: Fetch image (served from the content-addressed cache on follow-ups)
+                logger.info("📥 [VISION] Fetching image...")
+                
+                try:
+                    cached_image = await image_cache.fetch(image_url)
+                except ImageTooLargeError as size_error:
+                    logger.error(f"❌ [VISION] Image too large: {size_error}")
+                    return StreamingResponse(
+                        iter([f"❌ {size_error}. Please upload a smaller image."]),
+                        media_type="text/plain"
+                    )
+                except ImageDownloadError as download_error:
+                    logger.error(f"❌ [VISION] Failed to download image: HTTP {download_error.status_code}")
+                    return StreamingResponse(
+                        iter([f"❌ Could not download image from URL. HTTP status: {download_error.status_code}"]),
+                        media_type="text/plain"
+                    )
+                
+                image_bytes = cached_image["content"]
+                logger.info(f"📊 [VISION] Image ({cached_image['source']}) size: {len(image_bytes)} bytes")
+                
+                content_hash = cached_image["content_hash"]
+                
+                # Downscale / re-encode / tile off the event loop (cached per image hash)
+                processed = await image_preprocessor.preprocess(image_bytes, content_hash)
+                
+                if VisionConfig.IMAGE_HANDOFF_MODE == "file":
+                    # Create temporary files with appropriate extension
+                    file_extension = processed["format"] or image_url.split('.')[-1].split('?')[0] or 'jpg'
+                    if file_extension not in VisionConfig.SUPPORTED_IMAGE_EXTENSIONS:
                         file_extension = 'jpg'
                     
-                    # Save to temporary file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-                        temp_file.write(image_response.content)
-                        temp_image_path = temp_file.name
+                    for processed_bytes in processed["images"]:
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
+                            temp_file.write(processed_bytes)
+                            temp_image_paths.append(temp_file.name)
                     
-                    logger.info(f"✅ [VISION] Image downloaded to: {temp_image_path}")
-                    logger.info(f"📊 [VISION] Image size: {len(image_response.content)} bytes")
+                    image_payloads = list(temp_image_paths)
+                    logger.info(f"✅ [VISION] Image written to: {temp_image_paths}")
+                else:
+                    # ✅ Hand the bytes straight to Ollama, no disk round trip
+                    image_payloads = [
+                        base64.b64encode(processed_bytes).decode("ascii")
+                        for processed_bytes in processed["images"]
+                    ]
                 
                 # ✅ STEP 2: Prepare messages for vision model
                 vision_messages = []
@@ -303,59 +499,43 @@ async def enhanced_chat_endpoint(request: EnhancedChatRequest):
                         if hasattr(msg, 'role') and hasattr(msg, 'content'):
                             vision_messages.append({"role": msg.role, "content": msg.content})
                 
-                # Add the current user message with local image path
+                vision_prompt = f"Please analyze this image and answer my question: {request.message}"
+                if len(image_payloads) > 1:
+                    vision_prompt += "\n\n(The first image is the full picture; the following images are zoomed-in tiles of it.)"
+                
+                # Add the current user message with the image (base64 or local path)
                 vision_messages.append({
                     "role": "user", 
-                    "content": f"Please analyze this image and answer my question: {request.message}",
-                    "images": [temp_image_path]  # ✅ Use local file path instead of URL
+                    "content": vision_prompt,
+                    "images": image_payloads
                 })
                 
                 logger.info(f"🦙 [VISION] Sending to vision model with {len(vision_messages)} messages")
                 
-                # ✅ STEP 3: Try different vision models
-                vision_models = ["llava:13b", "llava:7b", "llama3.2-vision", "bakllava"]
+                # ✅ STEP 3: Resolve vision model from the cached catalog
                 selected_model = None
                 
-                client = AsyncClient(host=LLAMA_URL)
+                client = ollama_connection.get_client()
                 
                 # Find available vision model
                 try:
-                    available_models = await client.list()
-                    model_names = [model.model for model in available_models.models] if hasattr(available_models, 'models') else []
-                    
-                    for model in vision_models:
-                        if any(model in available_model for available_model in model_names):
-                            selected_model = model
-                            logger.info(f"🎯 [VISION] Using model: {selected_model}")
-                            break
-                    
-                    if not selected_model:
-                        # Try partial matches
-                        for model_info in model_names:
-                            if any(keyword in model_info.lower() for keyword in ['llava', 'vision', 'bakllava']):
-                                selected_model = model_info
-                                logger.info(f"🎯 [VISION] Using detected vision model: {selected_model}")
-                                break
+                    selected_model = await model_catalog.get_vision_model()
+                    if selected_model:
+                        logger.info(f"🎯 [VISION] Using model: {selected_model}")
                     
                     if not selected_model:
                         logger.error("❌ [VISION] No vision model available")
-                        # Clean up temp file
-                        try:
-                            os.unlink(temp_image_path)
-                        except:
-                            pass
+                        # Re-list on the next request so a fresh `ollama pull` is picked up
+                        model_catalog.invalidate()
+                        cleanup_temp_images(temp_image_paths)
                         return StreamingResponse(
-                            iter([f"❌ No vision-capable model is available. Please install one using:\n\nollama pull llava:7b\n\nThen restart this service."]),
+                            iter([f"❌ No vision-capable model is available. Please install one using:\n\nollama pull llava:7b\n\nThen try again."]),
                             media_type="text/plain"
                         )
                 
                 except Exception as model_check_error:
                     logger.error(f"❌ [VISION] Error checking models: {model_check_error}")
-                    # Clean up temp file
-                    try:
-                        os.unlink(temp_image_path)
-                    except:
-                        pass
+                    cleanup_temp_images(temp_image_paths)
                     return StreamingResponse(
                         iter([f"❌ Error checking available models: {str(model_check_error)}"]),
                         media_type="text/plain"
@@ -391,26 +571,26 @@ async def enhanced_chat_endpoint(request: EnhancedChatRequest):
                             
                             logger.info(f"✅ [VISION] Completed - {chunk_count} chunks, {len(total_content)} characters")
                             
+                            # This turn's answer becomes part of the image's notes, so later follow-ups can skip vision
+                            if VisionConfig.FOLLOW_UP_TEXT_MODE:
+                                image_descriptions.add_observation(
+                                    content_hash, request.message, total_content, url=image_url
+                                )
+                            
                         except Exception as stream_error:
                             logger.error(f"❌ [VISION] Stream error: {stream_error}")
                             yield f"\n\n❌ Vision processing error: {str(stream_error)}"
                         finally:
-                            # ✅ Clean up temporary file
-                            try:
-                                os.unlink(temp_image_path)
-                                logger.info("🗑️ [VISION] Cleaned up temporary image file")
-                            except Exception as cleanup_error:
-                                logger.warning(f"⚠️ [VISION] Could not clean up temp file: {cleanup_error}")
+                            cleanup_temp_images(temp_image_paths)
                     
                     return StreamingResponse(stream_vision_response(), media_type="text/plain")
                     
                 except Exception as ollama_error:
                     logger.error(f"❌ [VISION] Ollama call failed: {ollama_error}")
-                    # Clean up temp file
-                    try:
-                        os.unlink(temp_image_path)
-                    except:
-                        pass
+                    # Model may have been removed since the catalog was refreshed
+                    if getattr(ollama_error, "status_code", None) == 404:
+                        model_catalog.invalidate()
+                    cleanup_temp_images(temp_image_paths)
                     return StreamingResponse(
                         iter([f"❌ Vision model call failed: {str(ollama_error)}\n\nPlease ensure you have a vision model installed:\nollama pull llava:7b"]),
                         media_type="text/plain"
@@ -418,6 +598,7 @@ async def enhanced_chat_endpoint(request: EnhancedChatRequest):
             
             except Exception as vision_error:
                 logger.error(f"❌ [VISION] General error: {vision_error}")
+                cleanup_temp_images(temp_image_paths)
                 return StreamingResponse(
                     iter([f"❌ Vision processing failed: {str(vision_error)}"]),
                     media_type="text/plain"
@@ -486,15 +667,28 @@ Please analyze this document and answer the user's question based on the content
             # ✅ RAG PIPELINE (only for document-related queries)
             logger.info("📄 [RAG] Using RAG for document-specific query")
             try:
-                response = model_manager.get_rag_response(request.message, request.conversation_context)
-                
-                async def stream_rag_response():
-                    for i, char in enumerate(response):
-                        yield char
-                        if i % 3 == 0:
-                            await asyncio.sleep(0.01)
-                
-                return StreamingResponse(stream_rag_response(), media_type="text/plain")
+                scope = session_scopes.resolve(request.sessionId, request.docIds, request.tenantId)
+                if scope["doc_ids"] or scope["tenant_id"]:
+                    logger.info(f"📄 [RAG] Scoped to doc_ids={scope['doc_ids']} tenant_id={scope['tenant_id']}")
+                relevant_docs = await model_manager.aretrieve_relevant_documents(
+                    request.message, scope["doc_ids"], scope["tenant_id"]
+                )
+                if relevant_docs is None:
+                    # ✅ Empty knowledge base: tell the user to upload documents first
+                    logger.warning("⚠️ [RAG] No documents found in vector store")
+                    return StreamingResponse(iter([NO_DOCUMENTS_MESSAGE]), media_type="text/plain")
+                if relevant_docs:
+                    # ✅ Stream real LLM tokens, source footer appended at the end
+                    return StreamingResponse(
+                        model_manager.astream_rag_response(
+                            request.message, request.conversation_context, relevant_docs=relevant_docs
+                        ),
+                        media_type="text/plain"
+                    )
+                # ✅ Nothing passed the relevance threshold: skip the RAG prompt entirely
+                logger.info("🧠 [RAG] No relevant chunks - using general knowledge")
+                should_use_rag = False
+                final_prompt = request.message
             except Exception as rag_error:
                 logger.error(f"❌ RAG processing failed: {rag_error}")
                 final_prompt = request.message  # Fall back to general knowledge
@@ -550,7 +744,7 @@ Please analyze this document and answer the user's question based on the content
 
         # ✅ OLLAMA CHAT WITH ENHANCED PARAMETERS
         try:
-            client = AsyncClient(host=LLAMA_URL)
+            client = ollama_connection.get_client()
             
             # Optimized parameters for different content types
             is_document = request.type == "document" or request.extractedText
@@ -618,7 +812,8 @@ Please analyze this document and answer the user's question based on the content
 @app.post("/ingest_data")
 async def ingest_data(
     file: UploadFile = File(...),
-    doc_id: str = Form(...)
+    doc_id: str = Form(...),
+    tenant_id: Optional[str] = Form(None)
 ):
     """Ingests a new data sheet (PDF or image) into the RAG system."""
     logger.info(f"📄 [INGEST] Ingestion request received - File: {file.filename}, Doc ID: {doc_id}")
@@ -648,7 +843,7 @@ async def ingest_data(
         logger.info(f"📄 [INGEST] Processing {file.filename} ({len(content)} bytes)")
         
         # Process with ingestion service
-        await ingestion_service.ingest_document(file_path, doc_id)
+        await ingestion_service.ingest_document(file_path, doc_id, tenant_id=tenant_id)
         
         logger.info(f"✅ [INGEST] Successfully ingested {file.filename} with ID: {doc_id}")
         return {
@@ -680,7 +875,7 @@ async def ingest_data(
             os.remove(file_path)
 
 @app.delete("/delete_data")
-async def delete_data(doc_id: str = Form(...)):
+async def delete_data(doc_id: str = Form(...), tenant_id: Optional[str] = Form(None)):
     """Deletes a specific data sheet from the RAG system by its document ID."""
     logger.info(f"🗑️ [DELETE] Delete request received - Doc ID: {doc_id}")
     
@@ -699,7 +894,7 @@ async def delete_data(doc_id: str = Form(...)):
     try:
         logger.info(f"🗑️ [DELETE] Deleting document ID: {doc_id}")
         
-        success = ingestion_service.delete_document_by_id(doc_id)
+        success = await ingestion_service.adelete_document_by_id(doc_id, tenant_id=tenant_id)
         if success:
             logger.info(f"✅ [DELETE] Successfully deleted document with ID: {doc_id}")
             return {
@@ -734,6 +929,70 @@ async def delete_data(doc_id: str = Form(...)):
             "error": str(e)
         }
 
+# ✅ INDEX MIGRATION (re-embedding / re-chunking without downtime)
+@app.post("/rag/migrations")
+async def start_index_migration(request: IndexMigrationRequest):
+    """Rebuild the RAG index into a new collection in the background, then swap to it"""
+    if not index_migration_service:
+        raise HTTPException(status_code=503, detail="RAG services not available")
+    try:
+        job = index_migration_service.start(
+            embedding_model=request.embedding_model,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            drop_old_collection=bool(request.drop_old_collection),
+            projection=request.projection,
+            projection_dimension=request.projection_dimension,
+            hnsw_m=request.hnsw_m,
+            hnsw_construction_ef=request.hnsw_construction_ef,
+            hnsw_search_ef=request.hnsw_search_ef
+        )
+        return {"success": True, "job": job}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/rag/projections/report")
+async def projection_report(request: ProjectionReportRequest):
+    """Recall@k vs. dimension for PCA/truncation of the live vectors, to pick a projection_dimension"""
+    if not model_manager:
+        raise HTTPException(status_code=503, detail="RAG services not available")
+    try:
+        return await model_manager.aprojection_report(
+            request.projection, request.dimensions, request.k, request.sample
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/rag/migrations")
+async def list_index_migrations():
+    if not index_migration_service:
+        raise HTTPException(status_code=503, detail="RAG services not available")
+    return {
+        "active_index": model_manager.index_registry.active,
+        "jobs": index_migration_service.list_jobs()
+    }
+
+@app.get("/rag/migrations/{job_id}")
+async def get_index_migration(job_id: str):
+    if not index_migration_service:
+        raise HTTPException(status_code=503, detail="RAG services not available")
+    job = index_migration_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Migration job {job_id} not found")
+    return job
+
+@app.post("/rag/quantize")
+async def rebuild_quantized_index():
+    """Convert the live collection's vectors into the int8/fp16 search index in place"""
+    if not model_manager:
+        raise HTTPException(status_code=503, detail="RAG services not available")
+    try:
+        return await model_manager.arebuild_quantized_index()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.post("/intent", response_model=IntentResponse)
 async def intent_endpoint(request: IntentRequest):
     try:
@@ -769,6 +1028,9 @@ def root():
             "/chat": "POST (Main chat endpoint with document support and optional RAG)",
             "/ingest_data": "POST (Ingest a data sheet)" + (" - Available" if ingestion_service else " - Service not available"),
             "/delete_data": "DELETE (Delete a data sheet)" + (" - Available" if ingestion_service else " - Service not available"),
+            "/rag/migrations": "POST/GET (Re-embed the RAG index in the background and swap atomically)",
+            "/rag/quantize": "POST (Rebuild the int8/fp16 first-stage search index in place)",
+            "/rag/projections/report": "POST (Recall vs. dimension report for PCA/truncation of the stored vectors)",
             "/intent": "POST (Intent recognition)"
         }
     }
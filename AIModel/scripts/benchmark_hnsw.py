@@ -0,0 +1,171 @@
+"""
+Recall/latency benchmark for Chroma HNSW parameters.
+
+Replays a query set against the vectors stored under chroma_db/ and, for every
+combination of M / construction_ef / search_ef, builds a scratch in-memory HNSW
+index from those vectors (nothing is re-embedded, chroma_db/ is only read),
+then reports recall@k against exact search and p50/p99 query latency.
+
+    cd AIModel
+    python scripts/benchmark_hnsw.py --m 8 16 32 --construction-ef 100 200 --search-ef 10 50 100
+    python scripts/benchmark_hnsw.py --queries queries.txt -k 5 --output hnsw_report.json
+
+Without --queries, a random sample of stored chunk vectors is used as queries.
+Apply the chosen values with RAG_HNSW_* (new collections) or an index migration.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.rag_config import RAGConfig  # noqa: E402
+from services.collection_metadata import hnsw_parameters  # noqa: E402
+from services.index_registry import IndexRegistry  # noqa: E402
+from services.vector_projection import build_embeddings  # noqa: E402
+from services.vector_store import create_client  # noqa: E402
+
+ADD_BATCH_SIZE = 5000  # Below Chroma's maximum batch size
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark Chroma HNSW parameters (recall@k and latency)")
+    parser.add_argument("--persist-directory", default=RAGConfig.PERSIST_DIRECTORY)
+    parser.add_argument("--collection", help="Collection to read vectors from (default: the live one)")
+    parser.add_argument("--queries", help="Text file with one query per line, embedded with the live model")
+    parser.add_argument("--sample", type=int, default=200, help="Stored vectors used as queries without --queries")
+    parser.add_argument("-k", type=int, default=RAGConfig.HYBRID_CANDIDATES)
+    parser.add_argument("--m", type=int, nargs="+", default=[RAGConfig.HNSW_M])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[RAGConfig.HNSW_CONSTRUCTION_EF])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[RAGConfig.HNSW_SEARCH_EF])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    return parser.parse_args()
+
+
+def load_queries(args: argparse.Namespace, state: Dict[str, Any], vectors: np.ndarray) -> np.ndarray:
+    if args.queries:
+        with open(args.queries, "r") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        embeddings = build_embeddings(state["embedding_model"], state.get("projection"))
+        return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    rng = np.random.default_rng(args.seed)
+    picked = rng.choice(len(vectors), size=min(args.sample, len(vectors)), replace=False)
+    return vectors[picked]
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Row indices of the true top-k under the collection's distance function"""
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ vectors.T
+    if space == "l2":
+        # Ranking by -||q - v||^2; the ||q||^2 term is constant per query
+        scores = 2 * scores - (vectors ** 2).sum(axis=1)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+
+def latency_ms(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3)
+    }
+
+
+def benchmark_setting(ids: List[str], vectors: np.ndarray, queries: np.ndarray, exact_ids: List[set],
+                      k: int, space: str, m: int, construction_ef: int, search_ef: int) -> Dict[str, Any]:
+    client = chromadb.EphemeralClient()
+    name = f"hnsw_bench_{uuid.uuid4().hex[:8]}"
+    collection = client.create_collection(name, metadata={
+        "hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef
+    })
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(ids), ADD_BATCH_SIZE):
+            collection.add(
+                ids=ids[start:start + ADD_BATCH_SIZE],
+                embeddings=vectors[start:start + ADD_BATCH_SIZE].tolist()
+            )
+        build_seconds = time.perf_counter() - started
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, exact_ids):
+            started = time.perf_counter()
+            results = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len(expected & set(results["ids"][0])) / k)
+    finally:
+        client.delete_collection(name)
+
+    return {
+        "M": m,
+        "construction_ef": construction_ef,
+        "search_ef": search_ef,
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+        **latency_ms(latencies),
+        "build_seconds": round(build_seconds, 2)
+    }
+
+
+def main():
+    args = parse_args()
+    registry = IndexRegistry(args.persist_directory)
+    state = registry.active
+    collection_name = args.collection or state["collection_name"]
+    source = create_client(args.persist_directory).get_collection(collection_name)
+    if state["embedding_model"] is None:
+        state = registry.resolve_embedding_model(source)
+    stored = source.get(include=["embeddings"])
+    ids = list(stored["ids"])
+    if not ids:
+        sys.exit(f"Collection '{collection_name}' is empty")
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    space = (source.metadata or {}).get("hnsw:space", "l2")
+    k = min(args.k, len(ids))
+
+    queries = load_queries(args, state, vectors)
+    started = time.perf_counter()
+    exact = exact_search(vectors, queries, k, space)
+    exact_seconds = time.perf_counter() - started
+    exact_ids = [{ids[index] for index in row} for row in exact]
+
+    print(f"Collection {collection_name}: {len(ids)} vectors, {vectors.shape[1]}-d, space={space}, "
+          f"{len(queries)} queries, k={k}")
+    print(f"Current HNSW parameters: {hnsw_parameters(source.metadata) or 'Chroma defaults'}")
+    print(f"Exact search: {exact_seconds / len(queries) * 1000:.3f} ms/query (numpy, batched)")
+    print(f"{'M':>4} {'c_ef':>6} {'s_ef':>6} {'recall@' + str(k):>10} {'p50 ms':>9} {'p99 ms':>9} {'build s':>8}")
+
+    rows = []
+    for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef):
+        row = benchmark_setting(ids, vectors, queries, exact_ids, k, space, m, construction_ef, search_ef)
+        rows.append(row)
+        print(f"{m:>4} {construction_ef:>6} {search_ef:>6} {row[f'recall_at_{k}']:>10.4f} "
+              f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['build_seconds']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "collection": collection_name,
+                "vectors": len(ids),
+                "dimension": int(vectors.shape[1]),
+                "space": space,
+                "queries": len(queries),
+                "k": k,
+                "current_parameters": hnsw_parameters(source.metadata),
+                "results": rows
+            }, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import logging
+from typing import Any, Dict, Optional
+
+from config.rag_config import RAGConfig
+
+logger = logging.getLogger(__name__)
+
+# Metadata keys recorded on the Chroma collection
+EMBEDDING_MODEL_KEY = "embedding_model"
+EMBEDDING_DIMENSION_KEY = "embedding_dimension"
+
+# Chroma HNSW parameters, set when a collection is created
+HNSW_M_KEY = "hnsw:M"
+HNSW_CONSTRUCTION_EF_KEY = "hnsw:construction_ef"
+HNSW_SEARCH_EF_KEY = "hnsw:search_ef"
+HNSW_PARAMETER_KEYS = (HNSW_M_KEY, HNSW_CONSTRUCTION_EF_KEY, HNSW_SEARCH_EF_KEY)
+
+_dimension_cache: Dict[str, int] = {}
+
+
+class EmbeddingDimensionMismatchError(ValueError):
+    """Raised when a collection holds vectors of a different width than the configured embedder"""
+
+
+def probe_embedding_dimension(embeddings: Any, model_name: str) -> int:
+    """Embed a short probe once per model to learn its output dimension"""
+    if model_name not in _dimension_cache:
+        _dimension_cache[model_name] = len(embeddings.embed_query("dimension probe"))
+        logger.info(f"📐 Embedding model {model_name} produces {_dimension_cache[model_name]}-d vectors")
+    return _dimension_cache[model_name]
+
+
+def recorded_embedding_model(collection: Optional[Any]) -> str:
+    """
+    The embedding model a collection was built with: the recorded one, llama3 for
+    legacy collections that hold vectors but no metadata, else the default for new ones
+    """
+    if collection is not None:
+        recorded = (collection.metadata or {}).get(EMBEDDING_MODEL_KEY)
+        if recorded:
+            return recorded
+        if collection.count() > 0:
+            return RAGConfig.LEGACY_EMBEDDING_MODEL
+    return RAGConfig.DEFAULT_EMBEDDING_MODEL
+
+
+def hnsw_metadata(m: Optional[int] = None, construction_ef: Optional[int] = None,
+                  search_ef: Optional[int] = None) -> Dict[str, int]:
+    """hnsw:* metadata for a new collection: the given values, else the RAG_HNSW_* settings"""
+    return {
+        HNSW_M_KEY: m or RAGConfig.HNSW_M,
+        HNSW_CONSTRUCTION_EF_KEY: construction_ef or RAGConfig.HNSW_CONSTRUCTION_EF,
+        HNSW_SEARCH_EF_KEY: search_ef or RAGConfig.HNSW_SEARCH_EF
+    }
+
+
+def hnsw_parameters(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The hnsw:* parameters recorded on an existing collection (missing ones are Chroma defaults)"""
+    return {key: value for key, value in (metadata or {}).items() if key in HNSW_PARAMETER_KEYS}
+
+
+def get_writable_metadata(collection: Any) -> Dict[str, Any]:
+    """Collection metadata without the hnsw:* keys, which Chroma refuses to modify"""
+    return {
+        key: value for key, value in (collection.metadata or {}).items()
+        if not key.startswith("hnsw:")
+    }
+
+
+def ensure_embedding_compatibility(collection: Any, model_name: str, dimension: int):
+    """
+    Record the embedding model and dimension in the collection metadata, and refuse
+    to use a collection whose existing vectors have a different dimension.
+    """
+    metadata = collection.metadata or {}
+    stored_dimension = metadata.get(EMBEDDING_DIMENSION_KEY)
+
+    if stored_dimension is None and collection.count() > 0:
+        # Legacy collection without metadata: inspect one stored vector
+        sample = collection.peek(1)
+        sample_embeddings = sample.get("embeddings") if sample else None
+        if sample_embeddings is not None and len(sample_embeddings) > 0:
+            stored_dimension = len(sample_embeddings[0])
+
+    if stored_dimension is not None and int(stored_dimension) != dimension:
+        raise EmbeddingDimensionMismatchError(
+            f"Collection '{collection.name}' holds {stored_dimension}-d vectors "
+            f"(model: {metadata.get(EMBEDDING_MODEL_KEY, 'unknown')}) but embedding model "
+            f"'{model_name}' produces {dimension}-d vectors. Re-embed the collection or set "
+            f"RAG_EMBEDDING_MODEL to the model it was built with."
+        )
+
+    stored_model = metadata.get(EMBEDDING_MODEL_KEY)
+    if stored_model and stored_model != model_name and collection.count() > 0:
+        # Same width is not enough: vectors from different models are not comparable
+        raise EmbeddingDimensionMismatchError(
+            f"Collection '{collection.name}' was embedded with '{stored_model}', "
+            f"not '{model_name}'. Re-embed the collection before switching models."
+        )
+
+    if metadata.get(EMBEDDING_MODEL_KEY) != model_name or metadata.get(EMBEDDING_DIMENSION_KEY) != dimension:
+        updated = get_writable_metadata(collection)
+        updated[EMBEDDING_MODEL_KEY] = model_name
+        updated[EMBEDDING_DIMENSION_KEY] = dimension
+        collection.modify(metadata=updated)
+        logger.info(f"📝 Recorded embedding model {model_name} ({dimension}-d) on collection '{collection.name}'")
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Set
+
+from langchain_core.vectorstores import VectorStore
+
+from config.rag_config import RAGConfig
+from services.collection_metadata import (
+    EMBEDDING_DIMENSION_KEY,
+    EMBEDDING_MODEL_KEY,
+    ensure_embedding_compatibility,
+    hnsw_parameters
+)
+from services.vector_store import VectorStoreService, open_vector_store
+
+logger = logging.getLogger(__name__)
+
+SHARD_SEPARATOR = "__t_"
+
+
+class CollectionRouter:
+    """
+    Routes tenants to their own Chroma collection ("{base}__t_{tenant}") so each
+    tenant's HNSW index stays small. Shards are created lazily on first write and
+    kept in an LRU of open handles shared by ModelManager and IngestionService.
+    Requests without a tenant use the base collection.
+    """
+    def __init__(self, vector_service: Optional[VectorStoreService] = None,
+                 max_open: int = RAGConfig.MAX_OPEN_COLLECTIONS):
+        self.vector_service = vector_service or VectorStoreService()
+        self.max_open = max_open
+        self._handles: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._missing: Set[str] = set()  # Shards known not to exist (reads never create them)
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The process-wide client owned by the VectorStoreService"""
+        return self.vector_service.client
+
+    @staticmethod
+    def shard_name(base_collection: str, tenant_id: str) -> str:
+        tenant = re.sub(r"[^a-zA-Z0-9_-]", "-", str(tenant_id)).strip("-_")
+        if not tenant or len(tenant) > 40:
+            tenant = hashlib.sha1(str(tenant_id).encode("utf-8")).hexdigest()[:16]
+        return f"{base_collection}{SHARD_SEPARATOR}{tenant}"
+
+    def get(self, base_collection: str, tenant_id: str, embedding_function: Any,
+            embedding_model: str, dimension: int, create: bool = False) -> Optional[VectorStore]:
+        """Open handle for the tenant's shard; None if it does not exist and `create` is False"""
+        name = self.shard_name(base_collection, tenant_id)
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                return handle
+            if not create and name in self._missing:
+                return None
+
+            if not create:
+                try:
+                    self.client.get_collection(name)
+                except Exception:
+                    self._missing.add(name)
+                    return None
+
+            # New shards are built with the same HNSW parameters as their base collection
+            base_metadata = self.client.get_collection(base_collection).metadata if create else None
+            handle = open_vector_store(
+                name, embedding_function, client=self.client,
+                collection_metadata={
+                    **hnsw_parameters(base_metadata),
+                    EMBEDDING_MODEL_KEY: embedding_model,
+                    EMBEDDING_DIMENSION_KEY: dimension
+                }
+            )
+            ensure_embedding_compatibility(handle._collection, embedding_model, dimension)
+            self._missing.discard(name)
+
+            self._handles[name] = handle
+            while len(self._handles) > self.max_open:
+                evicted, _ = self._handles.popitem(last=False)
+                logger.debug(f"🗂️ [SHARDS] Closed handle for {evicted}")
+            return handle
+
+    def shard_names(self, base_collection: str) -> List[str]:
+        prefix = f"{base_collection}{SHARD_SEPARATOR}"
+        names = [
+            collection if isinstance(collection, str) else collection.name
+            for collection in self.client.list_collections()
+        ]
+        return sorted(name for name in names if name.startswith(prefix))
+
+    def shard_collections(self, base_collection: str) -> List[Any]:
+        """Raw collections of every shard of `base_collection` (for stats/index rebuilds)"""
+        return [self.client.get_collection(name) for name in self.shard_names(base_collection)]
+
+    def drop_shards(self, base_collection: str) -> int:
+        names = self.shard_names(base_collection)
+        with self._lock:
+            for name in names:
+                self._handles.pop(name, None)
+                self.client.delete_collection(name)
+        return len(names)
+
+    def clear(self):
+        """Forget open handles (after an index swap or embedding-model change)"""
+        with self._lock:
+            self._handles.clear()
+            self._missing.clear()
@@ -0,0 +1,158 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def _unit_rows(embeddings: List[Any]) -> np.ndarray:
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_similarities(query_embedding: List[float], embeddings: List[Any]) -> List[float]:
+    """Cosine similarity of the query against each embedding, independent of the collection's distance space"""
+    if len(embeddings) == 0:
+        return []
+    return (_unit_rows(embeddings) @ _unit_rows([query_embedding])[0]).tolist()
+
+
+def filter_relevant_hits(hits: List[Dict[str, Any]], min_similarity: float, relative_margin: float,
+                         min_lexical_score: float) -> List[Dict[str, Any]]:
+    """
+    One relevance rule for every retrieval mode. A hit is kept (in rank order) if
+    either its cosine similarity clears the absolute threshold and is within
+    `relative_margin` of the best hit, or its BM25 score ("score") is at least
+    `min_lexical_score` of the best BM25 score among the hits. Exact-term matches
+    (IDs, codes, rare names) that embeddings rank poorly survive on the second arm.
+    """
+    similarities = [hit["similarity"] for hit in hits if hit.get("similarity") is not None]
+    lexical_scores = [hit["score"] for hit in hits if hit.get("score") is not None]
+    if not similarities and not lexical_scores:
+        return list(hits)
+    best_similarity = max(similarities, default=None)
+    best_lexical = max(lexical_scores, default=0.0)
+
+    def is_relevant(hit: Dict[str, Any]) -> bool:
+        similarity = hit.get("similarity")
+        if (similarity is not None and similarity >= min_similarity
+                and similarity >= best_similarity - relative_margin):
+            return True
+        score = hit.get("score")
+        return score is not None and best_lexical > 0 and score / best_lexical >= min_lexical_score
+
+    kept = [hit for hit in hits if is_relevant(hit)]
+    best = f"{best_similarity:.3f}" if best_similarity is not None else "n/a"
+    logger.info(f"🎯 [RAG] {len(kept)}/{len(hits)} chunks passed the relevance threshold "
+                f"(best similarity {best}, best BM25 {best_lexical:.3f})")
+    return kept
+
+
+def mmr_select(hits: List[Dict[str, Any]], k: int, lambda_mult: float,
+               duplicate_similarity: float) -> List[Dict[str, Any]]:
+    """
+    Maximal marginal relevance over hits carrying "similarity" and "embedding":
+    each pick maximises lambda * relevance - (1 - lambda) * redundancy with the
+    chunks already picked. Near-duplicates of a picked chunk (e.g. re-uploads)
+    are dropped outright. Hits without an embedding keep their rank order.
+    """
+    scored = [hit for hit in hits if hit.get("embedding") is not None and hit.get("similarity") is not None]
+    if len(scored) < 2:
+        return hits[:k]
+
+    vectors = _unit_rows([hit["embedding"] for hit in scored])
+    relevance = np.asarray([hit["similarity"] for hit in scored], dtype=np.float32)
+    pairwise = vectors @ vectors.T
+
+    picked: List[int] = []
+    candidates = list(range(len(scored)))
+    while candidates and len(picked) < k:
+        if picked:
+            redundancy = pairwise[np.ix_(candidates, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(candidates), dtype=np.float32)
+        scores = lambda_mult * relevance[candidates] - (1 - lambda_mult) * redundancy
+        choice = candidates[int(np.argmax(scores))]
+        picked.append(choice)
+        candidates = [index for index in candidates if index != choice and pairwise[index, choice] < duplicate_similarity]
+
+    selected = [scored[index] for index in picked]
+    unscored = [hit for hit in hits if hit.get("embedding") is None or hit.get("similarity") is None]
+    return (selected + unscored)[:k]
+
+
+def merge_adjacent_chunks(documents: List[Document]) -> List[Document]:
+    """
+    Merge chunks of the same doc_id that overlap or touch (by their `start_index`
+    metadata) into one passage with the overlap removed. Each merged passage takes
+    the position of its best-ranked chunk; chunks without a start_index are kept as is.
+    """
+    groups: Dict[str, List[int]] = {}
+    for position, document in enumerate(documents):
+        if "start_index" in document.metadata:
+            groups.setdefault(str(document.metadata.get("doc_id", "unknown")), []).append(position)
+
+    replacement: Dict[int, Optional[Document]] = {}
+    for positions in groups.values():
+        ordered = sorted(positions, key=lambda position: documents[position].metadata["start_index"])
+        run = [ordered[0]]
+        for position in ordered[1:]:
+            previous = documents[run[-1]]
+            end = previous.metadata["start_index"] + len(previous.page_content)
+            if documents[position].metadata["start_index"] <= end:
+                run.append(position)
+            else:
+                _merge_run(documents, run, replacement)
+                run = [position]
+        _merge_run(documents, run, replacement)
+
+    merged = []
+    for position, document in enumerate(documents):
+        if position not in replacement:
+            merged.append(document)
+        elif replacement[position] is not None:
+            merged.append(replacement[position])
+    return merged
+
+
+def _merge_run(documents: List[Document], run: List[int], replacement: Dict[int, Optional[Document]]):
+    if len(run) < 2:
+        return
+    first = documents[run[0]]
+    text = first.page_content
+    end = first.metadata["start_index"] + len(text)
+    for position in run[1:]:
+        chunk = documents[position]
+        chunk_end = chunk.metadata["start_index"] + len(chunk.page_content)
+        if chunk_end > end:
+            text += chunk.page_content[end - chunk.metadata["start_index"]:]
+            end = chunk_end
+
+    best_rank = min(run)
+    for position in run:
+        replacement[position] = None
+    replacement[best_rank] = Document(page_content=text, metadata=dict(first.metadata))
+
+
+def fit_token_budget(documents: List[Document], token_budget: int) -> List[Document]:
+    """Keep passages in order until the prompt token budget is used (the first one always fits)"""
+    selected: List[Document] = []
+    used_tokens = 0
+    for document in documents:
+        tokens = estimate_tokens(document.page_content)
+        if selected and used_tokens + tokens > token_budget:
+            break
+        selected.append(document)
+        used_tokens += tokens
+    if documents:
+        logger.info(f"🎯 [RAG] Stuffing {len(selected)} passages (~{used_tokens} tokens)")
+    return selected
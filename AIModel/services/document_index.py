@@ -0,0 +1,123 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.collection_metadata import EMBEDDING_DIMENSION_KEY, EMBEDDING_MODEL_KEY, get_writable_metadata
+from services.retrieval_scope import UNTENANTED, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_COLLECTION_SUFFIX = "__docs"
+# Collection metadata flag: every centroid records the chunk collection (base or shard) it belongs to
+COLLECTION_SCOPED_KEY = "collection_scoped"
+
+
+class DocumentIndex:
+    """
+    One centroid vector per doc_id (the normalized mean of its chunk embeddings),
+    stored in a "{collection}__docs" Chroma collection next to the chunks.
+    Hierarchical retrieval first picks the nearest documents here, then searches
+    chunks only within them. Each centroid records the chunk collection (base or
+    tenant shard) holding its document, and searches are scoped to that collection.
+    """
+    def __init__(self, client_provider: Any):
+        # Called lazily so the shared chromadb client is only created when needed
+        self._client_provider = client_provider
+        self._collection = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def collection_name(base_collection: str) -> str:
+        return f"{base_collection}{DOCUMENT_COLLECTION_SUFFIX}"
+
+    @property
+    def document_count(self) -> int:
+        return self._collection.count() if self._collection is not None else 0
+
+    def open(self, base_collection: str, embedding_model: str, dimension: int, *chunk_collections: Any):
+        """
+        Switch to the document collection of `base_collection`, backfilling it from the
+        chunks if empty or built before centroids were scoped to their chunk collection
+        """
+        collection = self._client_provider().get_or_create_collection(
+            self.collection_name(base_collection),
+            metadata={"hnsw:space": "cosine", EMBEDDING_MODEL_KEY: embedding_model, EMBEDDING_DIMENSION_KEY: dimension}
+        )
+        with self._lock:
+            self._collection = collection
+        if (collection.metadata or {}).get(COLLECTION_SCOPED_KEY) and collection.count() > 0:
+            return
+        if collection.count() > 0:
+            collection.delete(ids=collection.get(include=[])["ids"])
+        if chunk_collections:
+            self.rebuild(*chunk_collections)
+        metadata = get_writable_metadata(collection)
+        metadata[COLLECTION_SCOPED_KEY] = True
+        collection.modify(metadata=metadata)
+
+    def adopt(self, other: "DocumentIndex"):
+        """Switch to the document collection another instance opened (and backfilled) off to the side"""
+        with self._lock:
+            self._collection = other._collection
+
+    def rebuild(self, *chunk_collections: Any):
+        """Recompute every document centroid from the stored chunk embeddings"""
+        built = 0
+        for chunk_collection in chunk_collections:
+            results = chunk_collection.get(include=["embeddings", "metadatas"])
+            embeddings = results.get("embeddings")
+            if embeddings is None:
+                continue
+            vectors_by_doc: Dict[str, List[Any]] = {}
+            metadata_by_doc: Dict[str, Dict[str, Any]] = {}
+            for embedding, metadata in zip(embeddings, results.get("metadatas") or []):
+                doc_id = str((metadata or {}).get("doc_id", "unknown"))
+                vectors_by_doc.setdefault(doc_id, []).append(embedding)
+                metadata_by_doc.setdefault(doc_id, metadata or {})
+
+            for doc_id, vectors in vectors_by_doc.items():
+                self.upsert(doc_id, chunk_collection.name, vectors, metadata_by_doc[doc_id])
+            built += len(vectors_by_doc)
+        logger.info(f"🗂️ [DOC INDEX] Built centroids for {built} documents")
+
+    def upsert(self, doc_id: str, chunk_collection: str, chunk_embeddings: List[Any],
+               metadata: Optional[Dict[str, Any]] = None):
+        """Store the centroid of a document whose chunks live in `chunk_collection`"""
+        if self._collection is None or len(chunk_embeddings) == 0:
+            return
+        centroid = np.asarray(chunk_embeddings, dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        if norm > 0:
+            centroid /= norm
+
+        document_metadata = {
+            "doc_id": str(doc_id),
+            "chunk_count": len(chunk_embeddings),
+            "tenant_id": (metadata or {}).get("tenant_id") or UNTENANTED,
+            "collection": chunk_collection
+        }
+        self._collection.upsert(
+            ids=[str(doc_id)], embeddings=[centroid.tolist()], metadatas=[document_metadata]
+        )
+
+    def delete(self, doc_id: str):
+        if self._collection is not None:
+            self._collection.delete(ids=[str(doc_id)])
+
+    def top_documents(self, embedding: List[float], k: int, chunk_collection: str,
+                      tenant_id: Optional[str] = None) -> List[str]:
+        """
+        doc_ids of the k documents whose centroid is nearest to the query, among those
+        stored in `chunk_collection` for the tenant (untenanted ones without)
+        """
+        if self._collection is None:
+            return []
+        results = self._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where={"$and": [{"collection": chunk_collection}, {"tenant_id": tenant_scope(tenant_id)}]},
+            include=[]
+        )
+        return results["ids"][0]
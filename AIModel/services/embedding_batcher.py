@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config.rag_config import RAGConfig
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collects query-embedding requests that arrive within a short window (or until
+    `max_batch` are queued) and sends them to Ollama as one batched embed call.
+    Each caller awaits its own vector.
+    """
+    def __init__(self, embeddings: Any,
+                 window_ms: float = RAGConfig.EMBED_BATCH_WINDOW_MS,
+                 max_batch: int = RAGConfig.EMBED_MAX_BATCH):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries in one window are embedded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        try:
+            vectors = await self.embeddings.aembed_documents(unique_texts)
+        except Exception as e:
+            logger.error(f"❌ [EMBED BATCH] Batch of {len(unique_texts)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+        if len(batch) > 1:
+            logger.info(f"📦 [EMBED BATCH] Embedded {len(batch)} queries in one call ({len(unique_texts)} unique)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
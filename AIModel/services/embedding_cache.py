@@ -0,0 +1,120 @@
+import logging
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config.rag_config import RAGConfig
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU of query embeddings keyed by (embedding model, normalized text).
+    Bounded by memory (vectors are stored as float32 arrays), with an optional TTL.
+    """
+    def __init__(self, max_bytes: int = RAGConfig.QUERY_EMBEDDING_CACHE_MAX_BYTES,
+                 ttl: float = RAGConfig.QUERY_EMBEDDING_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[array, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = (model, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vector, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector.tolist()
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        key = (model, normalize_query(text))
+        vector = array("f", embedding)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (vector, time.monotonic())
+            self._bytes += self._entry_size(key, vector)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, str]):
+        vector, _ = self._entries.pop(key)
+        self._bytes -= self._entry_size(key, vector)
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, str], vector: array) -> int:
+        return vector.itemsize * len(vector) + len(key[1])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper used by the RAG retriever: query embeddings go through
+    the QueryEmbeddingCache (and the EmbeddingBatcher on async misses),
+    document embeddings pass straight through.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: QueryEmbeddingCache,
+                 batcher: Optional[Any] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        # Async cache misses are micro-batched across concurrent requests when set
+        self.batcher = batcher
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        cached = self.cache.get(self.model_name, text)
+        if cached is not None:
+            return cached
+        embedding = self.embeddings.embed_query(text)
+        self.cache.put(self.model_name, text, embedding)
+        return embedding
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        cached = self.cache.get(self.model_name, text)
+        if cached is not None:
+            return cached
+        if self.batcher is not None:
+            embedding = await self.batcher.embed(text)
+        else:
+            embedding = await self.embeddings.aembed_query(text)
+        self.cache.put(self.model_name, text, embedding)
+        return embedding
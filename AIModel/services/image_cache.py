@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config.vision_config import VisionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ImageDownloadError(Exception):
+    """Raised when the origin does not return an image (non-200 response)"""
+    def __init__(self, status_code: int, message: Optional[str] = None):
+        self.status_code = status_code
+        super().__init__(message or f"HTTP {status_code}")
+
+
+class ImageTooLargeError(ImageDownloadError):
+    """Raised when an image exceeds VisionConfig.MAX_IMAGE_BYTES while downloading"""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(413, f"Image exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+
+class ImageCache:
+    """
+    Content-addressed cache for images downloaded by the vision path.
+
+    URLs map to a SHA-256 content hash; image bytes are stored once per hash,
+    so the same picture behind several URLs costs its size only once. The cache
+    is bounded by a byte budget and evicts least-recently-used URLs. Recently
+    validated entries are served without any network call; older ones are
+    revalidated with If-None-Match / If-Modified-Since.
+    """
+    def __init__(self, max_bytes: int = VisionConfig.IMAGE_CACHE_MAX_BYTES,
+                 fresh_seconds: float = VisionConfig.IMAGE_CACHE_FRESH_SECONDS,
+                 max_image_bytes: int = VisionConfig.MAX_IMAGE_BYTES):
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.max_image_bytes = max_image_bytes
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._blobs: Dict[str, bytes] = {}
+        self._blob_refs: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=VisionConfig.IMAGE_DOWNLOAD_TIMEOUT,
+                follow_redirects=True
+            )
+        return self._http_client
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def fetch(self, url: str) -> Dict[str, Any]:
+        """
+        Return {"content", "content_hash", "content_type", "source"} for `url`,
+        where source is "cache", "revalidated" or "download".
+        """
+        entry = self._entries.get(url)
+        now = time.monotonic()
+
+        if entry and now - entry["validated_at"] < self.fresh_seconds:
+            self._entries.move_to_end(url)
+            self.stats["hits"] += 1
+            logger.info(f"⚡ [IMAGE CACHE] Hit for {url} ({entry['size']} bytes)")
+            return self._result(entry, "cache")
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with self._get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry:
+                entry["validated_at"] = now
+                self._entries.move_to_end(url)
+                self.stats["revalidated"] += 1
+                logger.info(f"✅ [IMAGE CACHE] Revalidated {url} (304 Not Modified)")
+                return self._result(entry, "revalidated")
+
+            if response.status_code != 200:
+                raise ImageDownloadError(response.status_code)
+
+            content = await self._read_capped(response)
+
+        self.stats["misses"] += 1
+        entry = self._store(url, content, response.headers, now)
+        logger.info(f"📥 [IMAGE CACHE] Downloaded {url} ({entry['size']} bytes, sha256={entry['content_hash'][:12]})")
+        return self._result(entry, "download")
+
+    async def _read_capped(self, response: httpx.Response) -> bytes:
+        """Read the body, aborting as soon as it exceeds max_image_bytes"""
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_image_bytes:
+            raise ImageTooLargeError(self.max_image_bytes)
+
+        buffer = bytearray()
+        async for chunk in response.aiter_bytes():
+            buffer.extend(chunk)
+            if len(buffer) > self.max_image_bytes:
+                raise ImageTooLargeError(self.max_image_bytes)
+        return bytes(buffer)
+
+    def _store(self, url: str, content: bytes, headers: Any, now: float) -> Dict[str, Any]:
+        content_hash = hashlib.sha256(content).hexdigest()
+        entry = {
+            "content_hash": content_hash,
+            "content_type": headers.get("content-type"),
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "size": len(content),
+            "validated_at": now
+        }
+
+        if len(content) > self.max_bytes:
+            # Too large to cache; hand it back without storing
+            self._drop_url(url)
+            entry["content"] = content
+            return entry
+
+        self._drop_url(url)
+        if content_hash not in self._blobs:
+            self._blobs[content_hash] = content
+            self._blob_refs[content_hash] = 0
+            self._total_bytes += len(content)
+        self._blob_refs[content_hash] += 1
+        self._entries[url] = entry
+
+        self._evict()
+        return entry
+
+    def _drop_url(self, url: str):
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        content_hash = entry["content_hash"]
+        self._blob_refs[content_hash] -= 1
+        if self._blob_refs[content_hash] <= 0:
+            self._total_bytes -= len(self._blobs.pop(content_hash))
+            del self._blob_refs[content_hash]
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest_url = next(iter(self._entries))
+            self._drop_url(oldest_url)
+            self.stats["evictions"] += 1
+
+    def _result(self, entry: Dict[str, Any], source: str) -> Dict[str, Any]:
+        content = entry.get("content")
+        if content is None:
+            content = self._blobs[entry["content_hash"]]
+        return {
+            "content": content,
+            "content_hash": entry["content_hash"],
+            "content_type": entry["content_type"],
+            "source": source
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "unique_images": len(self._blobs),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,97 @@
+import logging
+import re
+from collections import OrderedDict
+from typing import Optional
+
+from config.vision_config import VisionConfig
+
+logger = logging.getLogger(__name__)
+
+# Older observations are dropped once an image's notes grow past this
+MAX_DESCRIPTION_CHARS = 8000
+
+# Questions that ask for fine visual detail; these go back to the vision model
+# unless the description already covers what they ask about.
+VISUAL_DETAIL_KEYWORDS = [
+    "color", "colour", "how many", "count", "read", "text", "written", "says", "exact",
+    "position", "left", "right", "top", "bottom", "corner", "background", "foreground",
+    "behind", "next to", "size", "shape", "detail", "small", "zoom", "closer", "pixel"
+]
+
+# Phrases that always need a fresh look at the image
+FORCE_VISION_PHRASES = ["look again", "look closer", "zoom in", "re-check the image", "check the image again"]
+
+VISUAL_DETAIL_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in VISUAL_DETAIL_KEYWORDS) + r")\b")
+FORCE_VISION_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in FORCE_VISION_PHRASES) + r")\b")
+
+STOPWORDS = {
+    "what", "which", "where", "when", "does", "there", "this", "that", "image", "picture",
+    "photo", "with", "from", "have", "they", "them", "their", "about", "into", "could",
+    "would", "should", "tell", "please", "some", "many", "much", "more", "most", "also"
+}
+
+
+class ImageDescriptionStore:
+    """
+    Caches what the vision model has said about each image (by content hash) so
+    follow-up questions can be answered by the cheaper text model. The notes are
+    the questions and answers of the vision turns themselves, so no extra vision
+    call is made; image URLs are remembered so a follow-up needs no download.
+    """
+    def __init__(self, max_entries: int = VisionConfig.IMAGE_DESCRIPTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._descriptions: "OrderedDict[str, str]" = OrderedDict()
+        self._hash_by_url: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, content_hash: str) -> Optional[str]:
+        description = self._descriptions.get(content_hash)
+        if description is not None:
+            self._descriptions.move_to_end(content_hash)
+        return description
+
+    def get_for_url(self, url: str) -> Optional[str]:
+        """Description of the image last seen at `url`, without fetching it"""
+        content_hash = self._hash_by_url.get(url)
+        return self.get(content_hash) if content_hash else None
+
+    def put(self, content_hash: str, description: str, url: Optional[str] = None):
+        if not description or not description.strip():
+            return
+        self._descriptions[content_hash] = description.strip()[-MAX_DESCRIPTION_CHARS:]
+        self._descriptions.move_to_end(content_hash)
+        while len(self._descriptions) > self.max_entries:
+            self._descriptions.popitem(last=False)
+        if url:
+            self._hash_by_url[url] = content_hash
+            self._hash_by_url.move_to_end(url)
+            while len(self._hash_by_url) > self.max_entries:
+                self._hash_by_url.popitem(last=False)
+
+    def add_observation(self, content_hash: str, question: str, answer: str, url: Optional[str] = None):
+        """Append a vision turn (question and the model's answer) to the image's notes"""
+        if not answer or not answer.strip():
+            return
+        observation = f"Asked: {question.strip()}\nThe vision model answered: {answer.strip()}"
+        previous = self._descriptions.get(content_hash)
+        self.put(content_hash, f"{previous}\n\n{observation}" if previous else observation, url)
+
+    def needs_visual_detail(self, question: str, description: str) -> bool:
+        """Heuristic: go back to vision only for detail questions the description does not cover"""
+        question_lower = question.lower()
+
+        if FORCE_VISION_PATTERN.search(question_lower):
+            return True
+
+        if not VISUAL_DETAIL_PATTERN.search(question_lower):
+            return False
+
+        description_words = set(re.findall(r"[a-z]+", description.lower()))
+        terms = [
+            word for word in re.findall(r"[a-z]{4,}", question_lower)
+            if word not in STOPWORDS and not VISUAL_DETAIL_PATTERN.fullmatch(word)
+        ]
+        if not terms:
+            return True
+
+        covered = sum(1 for term in terms if term in description_words)
+        return covered / len(terms) < 0.5
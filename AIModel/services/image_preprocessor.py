@@ -0,0 +1,144 @@
+import asyncio
+import io
+import logging
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.vision_config import VisionConfig
+
+# ✅ Pillow is optional: without it images are passed through unchanged
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError as e:
+    print(f"⚠️ Pillow not available, image preprocessing disabled: {e}")
+    HAS_PIL = False
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessor:
+    """
+    Downscales, re-encodes and optionally tiles images before vision inference.
+    Work runs in a dedicated thread pool so decoding large photos never blocks
+    the event loop, and results are cached per image content hash.
+    """
+    def __init__(self,
+                 target_size: int = VisionConfig.IMAGE_TARGET_SIZE,
+                 output_format: str = VisionConfig.IMAGE_OUTPUT_FORMAT,
+                 quality: int = VisionConfig.IMAGE_OUTPUT_QUALITY,
+                 tiling_enabled: bool = VisionConfig.IMAGE_TILING_ENABLED,
+                 max_workers: int = VisionConfig.IMAGE_PREPROCESS_WORKERS,
+                 cache_size: int = VisionConfig.IMAGE_PREPROCESS_CACHE_SIZE):
+        self.enabled = VisionConfig.IMAGE_PREPROCESS_ENABLED and HAS_PIL
+        self.target_size = target_size
+        self.output_format = output_format
+        self.quality = quality
+        self.tiling_enabled = tiling_enabled
+        self.cache_size = cache_size
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="image-preprocess"
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def preprocess(self, image_bytes: bytes, content_hash: str) -> Dict[str, Any]:
+        """
+        Return {"images": [bytes, ...], "format": "jpeg", "preprocessed": bool}.
+        The first image is always the whole (downscaled) picture; tiles follow it.
+        """
+        if not self.enabled:
+            return {"images": [image_bytes], "format": None, "preprocessed": False}
+
+        cache_key = (content_hash, self.target_size, self.output_format, self.quality, self.tiling_enabled)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.info(f"⚡ [PREPROCESS] Cache hit for {content_hash[:12]}")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        try:
+            images = await loop.run_in_executor(self._get_executor(), self._process_sync, image_bytes)
+        except Exception as e:
+            logger.warning(f"⚠️ [PREPROCESS] Failed, sending original image: {e}")
+            return {"images": [image_bytes], "format": None, "preprocessed": False}
+
+        result = {"images": images, "format": self.output_format.lower(), "preprocessed": True}
+        self._cache[cache_key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        output_bytes = sum(len(image) for image in images)
+        logger.info(
+            f"🖼️ [PREPROCESS] {len(image_bytes)} -> {output_bytes} bytes "
+            f"({len(images)} image(s)) for {content_hash[:12]}"
+        )
+        return result
+
+    def _process_sync(self, image_bytes: bytes) -> List[bytes]:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            # Apply the EXIF orientation before the metadata is dropped on re-encode
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGB")
+
+        images = [self._encode(self._downscale(image))]
+
+        if self.tiling_enabled and max(image.size) > self.target_size * VisionConfig.IMAGE_TILE_THRESHOLD:
+            images.extend(self._encode(self._downscale(tile)) for tile in self._tiles(image))
+
+        return images
+
+    def _downscale(self, image):
+        if max(image.size) <= self.target_size:
+            return image
+        image = image.copy()
+        image.thumbnail((self.target_size, self.target_size), Image.LANCZOS)
+        return image
+
+    def _tiles(self, image) -> List[Any]:
+        """Split into a near-square grid of at most IMAGE_MAX_TILES tiles"""
+        width, height = image.size
+        columns = max(1, math.ceil(math.sqrt(VisionConfig.IMAGE_MAX_TILES)))
+        rows = max(1, VisionConfig.IMAGE_MAX_TILES // columns)
+        if height > width:
+            columns, rows = rows, columns
+
+        tile_width = math.ceil(width / columns)
+        tile_height = math.ceil(height / rows)
+        tiles = []
+        for row in range(rows):
+            for column in range(columns):
+                box = (
+                    column * tile_width,
+                    row * tile_height,
+                    min(width, (column + 1) * tile_width),
+                    min(height, (row + 1) * tile_height)
+                )
+                tiles.append(image.crop(box))
+        return tiles
+
+    def _encode(self, image) -> bytes:
+        # Saving a fresh RGB image writes no EXIF/GPS metadata
+        buffer = io.BytesIO()
+        save_kwargs = {"quality": self.quality}
+        if self.output_format == "JPEG":
+            save_kwargs["optimize"] = True
+        image.save(buffer, format=self.output_format, **save_kwargs)
+        return buffer.getvalue()
@@ -0,0 +1,393 @@
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from langchain_core.vectorstores import VectorStore
+from langchain_ollama import OllamaEmbeddings
+
+from config.rag_config import RAGConfig
+from services.collection_metadata import (
+    EMBEDDING_DIMENSION_KEY,
+    EMBEDDING_MODEL_KEY,
+    hnsw_metadata,
+    probe_embedding_dimension
+)
+from services.collection_router import CollectionRouter
+from services.document_index import DocumentIndex
+from services.quantized_index import QuantizedIndex
+from services.retrieval_scope import TENANT_TAGGED_KEY, UNTENANTED
+from services.vector_projection import (
+    PROJECTION_DIMENSION_KEY,
+    PROJECTION_DIRECTORY,
+    PROJECTION_KIND_KEY,
+    PROJECTION_KINDS,
+    ProjectedEmbeddings,
+    VectorProjection,
+    embedding_key
+)
+from services.source_store import merge_overlapping_chunks, source_fingerprint
+from services.vector_store import open_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class IndexMigrationService:
+    """
+    Rebuilds the RAG index into a new versioned collection in the background
+    (new embedding model and/or chunking) and then switches ModelManager and
+    IngestionService to it in one step through the shared IndexRegistry.
+    Queries keep using the old collection until the swap.
+    """
+    def __init__(self, model_manager, ingestion_service):
+        self.model_manager = model_manager
+        self.ingestion_service = ingestion_service
+        self.index_registry = model_manager.index_registry
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._running_job_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        # One worker: the rebuild never competes with itself for Ollama
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-migration")
+
+    def start(self, embedding_model: Optional[str] = None, chunk_size: Optional[int] = None,
+              chunk_overlap: Optional[int] = None, drop_old_collection: bool = False,
+              projection: Optional[str] = None, projection_dimension: Optional[int] = None,
+              hnsw_m: Optional[int] = None, hnsw_construction_ef: Optional[int] = None,
+              hnsw_search_ef: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Start a migration job; only one may run at a time. With `projection` ("pca" or
+        "truncate") the new collection stores vectors reduced to `projection_dimension`.
+        The hnsw_* values (default: RAG_HNSW_*) set the new collection's HNSW index.
+        """
+        if self._running_job_id:
+            raise RuntimeError(f"Index migration {self._running_job_id} is already running")
+        if projection is not None and (projection not in PROJECTION_KINDS or not projection_dimension):
+            raise ValueError(f"projection must be one of {PROJECTION_KINDS} and needs projection_dimension")
+
+        active = self.index_registry.active
+        if active["embedding_model"] is None:
+            active = self.index_registry.resolve_embedding_model(
+                self.model_manager.vector_service.find_collection(active["collection_name"])
+            )
+        job_id = f"migration_{uuid.uuid4().hex[:8]}"
+        job = {
+            "job_id": job_id,
+            "status": "pending",
+            "source_collection": active["collection_name"],
+            "target_collection": self.index_registry.next_collection_name(),
+            "embedding_model": embedding_model or active["embedding_model"],
+            "chunk_size": chunk_size or active["chunk_size"],
+            "chunk_overlap": chunk_overlap if chunk_overlap is not None else active["chunk_overlap"],
+            "drop_old_collection": drop_old_collection,
+            "projection": projection,
+            "projection_dimension": projection_dimension if projection else None,
+            "hnsw": hnsw_metadata(hnsw_m, hnsw_construction_ef, hnsw_search_ef),
+            "total_documents": 0,
+            "processed_documents": 0,
+            "chunks_written": 0,
+            "progress": 0,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "error": None
+        }
+        self.jobs[job_id] = job
+        self._running_job_id = job_id
+        self._task = asyncio.create_task(self._run(job))
+        logger.info(f"🚚 [MIGRATION] Started {job_id}: {job['source_collection']} -> {job['target_collection']}")
+        return dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [dict(job) for job in self.jobs.values()]
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _run(self, job: Dict[str, Any]):
+        try:
+            job["status"] = "running"
+            embeddings = OllamaEmbeddings(model=job["embedding_model"])
+            # The raw source collection, read without the embedding guard: a migration is
+            # how a collection that no longer matches the configured model gets repaired
+            source = await self._run_blocking(
+                self.model_manager.vector_service.find_collection, job["source_collection"]
+            )
+            if source is not None and not self.model_manager.vector_stats.is_reconciled:
+                await self._run_blocking(self.model_manager.vector_stats.reconcile, source)
+            projection_state = None
+            if job["projection"]:
+                # Fit offline, store it next to the collection, and project every written vector
+                projection = await self._run_blocking(self._fit_projection, job, embeddings, source)
+                projection_path = await self._run_blocking(projection.save, job["target_collection"])
+                projection_state = projection.describe(projection_path)
+                embeddings = ProjectedEmbeddings(embeddings, projection)
+            model_key = embedding_key(job["embedding_model"], projection_state)
+            dimension = await self._run_blocking(probe_embedding_dimension, embeddings, model_key)
+            target = await self._run_blocking(self._create_target, job, embeddings, dimension)
+            # Tenant shards of the new collection are created as their documents arrive
+            targets: Dict[Optional[str], VectorStore] = {None: target}
+
+            # 1. Bulk rebuild from stored source text (or the old chunks for legacy documents)
+            doc_ids = self._live_doc_ids()
+            job["total_documents"] = len(doc_ids)
+            migrated: Dict[str, Optional[str]] = {}  # doc_id -> fingerprint of the copied source
+            for doc_id in doc_ids:
+                migrated[doc_id] = await self._migrate_document(job, doc_id, source, targets, embeddings, dimension)
+
+            # 2. Catch up with ingests, re-uploads and deletes that happened during the rebuild
+            for _ in range(3):
+                missing, changed, removed = await self._run_blocking(self._diff, migrated)
+                if not missing and not changed and not removed:
+                    break
+                job["total_documents"] += len(missing) + len(changed)
+                for doc_id in removed | changed:
+                    await self._run_blocking(self._remove_from_targets, targets, doc_id)
+                    migrated.pop(doc_id, None)
+                for doc_id in missing | changed:
+                    migrated[doc_id] = await self._migrate_document(job, doc_id, source, targets, embeddings, dimension)
+
+            # 3. The O(N) side-index builds (counters, BM25, quantized, centroids) and the embedder
+            # probe happen here, once for both services, before ingests are held off
+            prepared = await self._run_blocking(self.model_manager._prepare_index, {
+                "collection_name": job["target_collection"],
+                "embedding_model": job["embedding_model"],
+                "chunk_size": job["chunk_size"],
+                "chunk_overlap": job["chunk_overlap"],
+                "projection": projection_state
+            })
+
+            # 4. With ingest/delete held off: last catch-up, convergence check and atomic switch
+            await self._run_blocking(
+                self._finalize, job, source, targets, embeddings, dimension, migrated, prepared
+            )
+
+            if job["drop_old_collection"]:
+                await self._run_blocking(self.model_manager.vector_service.delete_collection, job["source_collection"])
+                await self._run_blocking(self.model_manager.collection_router.drop_shards, job["source_collection"])
+                await self._run_blocking(self._drop_document_index, job["source_collection"])
+                await self._run_blocking(QuantizedIndex.drop, job["source_collection"])
+                old_projection = os.path.join(PROJECTION_DIRECTORY, f"{job['source_collection']}.npz")
+                if os.path.exists(old_projection):
+                    os.remove(old_projection)
+                logger.info(f"🗑️ [MIGRATION] Dropped old collection {job['source_collection']}")
+
+            job["status"] = "completed"
+            job["progress"] = 100
+            logger.info(f"✅ [MIGRATION] {job['job_id']} completed: {job['chunks_written']} chunks in {job['target_collection']}")
+
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            logger.error(f"❌ [MIGRATION] {job['job_id']} failed: {e}")
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._running_job_id = None
+
+    def _fit_projection(self, job: Dict[str, Any], embeddings: OllamaEmbeddings, source: Optional[Any]) -> VectorProjection:
+        """Fit on the stored vectors when they are full-width vectors of the same model, else on fresh embeddings"""
+        if source is None:
+            raise ValueError(f"Collection '{job['source_collection']}' does not exist; nothing to fit a projection on")
+        active = self.index_registry.active
+        if active["embedding_model"] == job["embedding_model"] and not active.get("projection"):
+            results = source.get(limit=RAGConfig.PROJECTION_FIT_SAMPLE, include=["embeddings"])
+            vectors = results["embeddings"]
+        else:
+            results = source.get(limit=RAGConfig.PROJECTION_FIT_SAMPLE, include=["documents"])
+            texts = [text for text in results["documents"] if text]
+            vectors = []
+            for start in range(0, len(texts), RAGConfig.MIGRATION_BATCH_SIZE):
+                vectors.extend(embeddings.embed_documents(texts[start:start + RAGConfig.MIGRATION_BATCH_SIZE]))
+        return VectorProjection.fit(job["projection"], job["projection_dimension"], vectors)
+
+    def _drop_document_index(self, collection_name: str):
+        try:
+            self.model_manager.collection_router.client.delete_collection(DocumentIndex.collection_name(collection_name))
+        except Exception:
+            pass  # Hierarchical retrieval was never enabled for the old collection
+
+    def _live_doc_ids(self) -> List[str]:
+        doc_ids = set(self.model_manager.vector_stats.get_doc_ids())
+        doc_ids.update(self.ingestion_service.source_store.list_doc_ids())
+        doc_ids.discard("unknown")
+        return sorted(doc_ids)
+
+    def _create_target(self, job: Dict[str, Any], embeddings: OllamaEmbeddings, dimension: int,
+                       collection_name: Optional[str] = None) -> VectorStore:
+        collection_name = collection_name or job["target_collection"]
+        metadata = {
+            EMBEDDING_MODEL_KEY: getattr(embeddings, "model", job["embedding_model"]),
+            EMBEDDING_DIMENSION_KEY: dimension,
+            "chunk_size": job["chunk_size"],
+            "chunk_overlap": job["chunk_overlap"],
+            TENANT_TAGGED_KEY: True  # Chunks are re-split through split_text, which stamps tenant_id
+        }
+        metadata.update(job["hnsw"])
+        if job["projection"]:
+            metadata[PROJECTION_KIND_KEY] = job["projection"]
+            metadata[PROJECTION_DIMENSION_KEY] = job["projection_dimension"]
+        # Not shared until the switch, so it is opened on the process-wide client directly
+        client = self.model_manager.vector_service.client
+        target = open_vector_store(collection_name, embeddings, client, collection_metadata=metadata)
+        if target._collection.count() > 0:
+            # Leftover from an interrupted migration: start clean
+            target.delete_collection()
+            target = open_vector_store(collection_name, embeddings, client, collection_metadata=metadata)
+        return target
+
+    def _load_source(self, doc_id: str, source: Optional[Any]) -> Optional[Dict[str, Any]]:
+        stored = self.ingestion_service.source_store.load(doc_id)
+        if stored or source is None:
+            return stored
+
+        # Legacy document ingested before source text was kept: rebuild it from its chunks
+        results = source.get(where={"doc_id": doc_id}, include=["documents", "metadatas"])
+        documents = results.get("documents") or []
+        metadatas = results.get("metadatas") or []
+        if not documents:
+            return None
+
+        ordered = sorted(zip(documents, metadatas), key=lambda pair: (pair[1] or {}).get("start_index", 0))
+        text = merge_overlapping_chunks([document for document, _ in ordered])
+        first_metadata = ordered[0][1] or {}
+        metadata = {
+            "doc_id": str(doc_id),
+            "source_file": first_metadata.get("source_file", "unknown"),
+            "ingested_at": first_metadata.get("ingested_at", datetime.now().isoformat()),
+            "tenant_id": first_metadata.get("tenant_id") or UNTENANTED
+        }
+        self.ingestion_service.source_store.save(doc_id, text, metadata)
+        return {"doc_id": doc_id, "text": text, "metadata": metadata}
+
+    def _diff(self, migrated: Dict[str, Optional[str]]):
+        """Live documents missing from the target, re-uploaded since they were copied, and deleted since"""
+        live = {
+            doc_id: source_fingerprint(self.ingestion_service.source_store.load(doc_id))
+            for doc_id in self._live_doc_ids()
+        }
+        missing = set(live) - set(migrated)
+        removed = set(migrated) - set(live)
+        changed = {
+            doc_id for doc_id in set(live) & set(migrated)
+            if live[doc_id] is not None and live[doc_id] != migrated[doc_id]
+        }
+        return missing, changed, removed
+
+    def _remove_from_targets(self, targets: Dict[Optional[str], VectorStore], doc_id: str,
+                             prepared: Optional[Dict[str, Any]] = None):
+        for handle in list(targets.values()):
+            handle._collection.delete(where={"doc_id": doc_id})
+            if prepared is not None and prepared["quantized_index"] is not None:
+                prepared["quantized_index"].remove_doc(handle._collection.name, doc_id)
+        if prepared is not None:
+            # Side indexes built before the gate follow the catch-up by the same delta
+            prepared["vector_stats"].record_delete(doc_id)
+            prepared["lexical_index"].remove_doc(doc_id)
+            if prepared["document_index"] is not None:
+                prepared["document_index"].delete(doc_id)
+
+    def _write_to_target(self, target: VectorStore, doc_id: str, chunks: List[Any],
+                         embeddings: OllamaEmbeddings, prepared: Dict[str, Any]):
+        """Copy one document's chunks and add them to the prepared side indexes (the catch-up under the gate)"""
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = embeddings.embed_documents(texts)
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+        collection = target._collection
+        collection.upsert(ids=ids, embeddings=vectors, metadatas=metadatas, documents=texts)
+        prepared["vector_stats"].record_ingest(doc_id, len(ids))
+        prepared["lexical_index"].add_documents(ids, chunks)
+        if prepared["document_index"] is not None:
+            prepared["document_index"].upsert(doc_id, collection.name, vectors, metadatas[0])
+        if prepared["quantized_index"] is not None:
+            prepared["quantized_index"].add(collection.name, ids, vectors, metadatas)
+
+    def _finalize(self, job: Dict[str, Any], source: Optional[Any], targets: Dict[Optional[str], VectorStore],
+                  embeddings: OllamaEmbeddings, dimension: int, migrated: Dict[str, Optional[str]],
+                  prepared: Dict[str, Any]):
+        """
+        Runs under the ingestion gate, so no upload or delete can land between the last
+        diff and the switch; refuses to activate while the collections still diverge.
+        Only the last delta and O(1) handle swaps happen here: `prepared` was built beforehand.
+        """
+        with self.ingestion_service.ingest_gate.write():
+            missing, changed, removed = self._diff(migrated)
+            job["total_documents"] += len(missing) + len(changed)
+            for doc_id in removed | changed:
+                self._remove_from_targets(targets, doc_id, prepared)
+                migrated.pop(doc_id, None)
+            for doc_id in missing | changed:
+                document = self._prepare_document(job, doc_id, source, targets, embeddings, dimension)
+                migrated[doc_id] = document["fingerprint"]
+                if document["chunks"]:
+                    self._write_to_target(document["target"], doc_id, document["chunks"], embeddings, prepared)
+                    job["chunks_written"] += len(document["chunks"])
+                job["processed_documents"] += 1
+
+            missing, changed, removed = self._diff(migrated)
+            if missing or changed or removed:
+                raise RuntimeError(
+                    f"Target collection diverges from the live index ({len(missing)} missing, "
+                    f"{len(changed)} changed, {len(removed)} removed documents); not activating"
+                )
+
+            # Both services switch to the same prepared handles; nothing is rebuilt or re-probed here
+            self.model_manager._activate_prepared(prepared)
+            self.ingestion_service._open_active_index(prepared)
+
+    def _prepare_document(self, job: Dict[str, Any], doc_id: str, source: Optional[Any],
+                          targets: Dict[Optional[str], VectorStore], embeddings: OllamaEmbeddings,
+                          dimension: int) -> Dict[str, Any]:
+        """Target handle, re-split chunks and source fingerprint for one document"""
+        stored = self._load_source(doc_id, source)
+        if not stored:
+            logger.warning(f"⚠️ [MIGRATION] No source text for {doc_id}, skipping")
+            return {"target": None, "chunks": [], "fingerprint": None}
+        tenant_id = (stored["metadata"].get("tenant_id") or None) if RAGConfig.TENANT_SHARDING else None
+        if tenant_id not in targets:
+            shard_name = CollectionRouter.shard_name(job["target_collection"], tenant_id)
+            targets[tenant_id] = self._create_target(job, embeddings, dimension, shard_name)
+        chunks = self.ingestion_service.split_text(
+            stored["text"], stored["metadata"], job["chunk_size"], job["chunk_overlap"]
+        )
+        return {"target": targets[tenant_id], "chunks": chunks, "fingerprint": source_fingerprint(stored)}
+
+    async def _migrate_document(self, job: Dict[str, Any], doc_id: str, source: Optional[Any],
+                                targets: Dict[Optional[str], VectorStore], embeddings: OllamaEmbeddings,
+                                dimension: int) -> Optional[str]:
+        """Copy one document in throttled batches; returns the fingerprint of what was copied"""
+        prepared = await self._run_blocking(
+            self._prepare_document, job, doc_id, source, targets, embeddings, dimension
+        )
+        chunks = prepared["chunks"]
+        for start in range(0, len(chunks), RAGConfig.MIGRATION_BATCH_SIZE):
+            await self._yield_to_chat()
+            batch = chunks[start:start + RAGConfig.MIGRATION_BATCH_SIZE]
+            await self._run_blocking(prepared["target"].add_documents, batch)
+            job["chunks_written"] += len(batch)
+            await asyncio.sleep(RAGConfig.MIGRATION_BATCH_DELAY)
+
+        job["processed_documents"] += 1
+        job["progress"] = int(99 * job["processed_documents"] / max(job["total_documents"], 1))
+        return prepared["fingerprint"]
+
+    async def _yield_to_chat(self):
+        """Throttle: hold off while chat RAG requests are in flight (bounded wait)"""
+        waited = 0.0
+        while self.model_manager.active_rag_requests > 0 and waited < RAGConfig.MIGRATION_MAX_YIELD_SECONDS:
+            await asyncio.sleep(0.2)
+            waited += 0.2
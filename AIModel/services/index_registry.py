@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.rag_config import RAGConfig
+from services.collection_metadata import recorded_embedding_model
+
+logger = logging.getLogger(__name__)
+
+
+class IndexRegistry:
+    """
+    Tracks which Chroma collection is live, together with the embedding model
+    and chunking parameters it was built with. ModelManager and IngestionService
+    share one registry and re-open their handles when its version changes, so an
+    index migration switches both of them with a single `activate` call.
+    """
+    def __init__(self, persist_directory: str = RAGConfig.PERSIST_DIRECTORY):
+        self.state_path = Path(persist_directory) / "index_state.json"
+        self._lock = threading.Lock()
+        self._state = self._load()
+        logger.info(
+            f"✅ IndexRegistry: active collection '{self._state['collection_name']}' "
+            f"(embedding: {self._state['embedding_model']}, version {self._state['version']})"
+        )
+
+    def _default_state(self) -> Dict[str, Any]:
+        return {
+            "collection_name": RAGConfig.COLLECTION_NAME,
+            "embedding_model": RAGConfig.EMBEDDING_MODEL,  # None: taken from the collection on first open
+            "chunk_size": RAGConfig.CHUNK_SIZE,
+            "chunk_overlap": RAGConfig.CHUNK_OVERLAP,
+            "projection": None,  # {"kind", "dimension", "path"} when vectors are dimension-reduced
+            "version": 0,
+            "activated_at": None
+        }
+
+    def _load(self) -> Dict[str, Any]:
+        # Until the first migration the live index is described by the environment
+        if not self.state_path.exists():
+            return self._default_state()
+        try:
+            with open(self.state_path, "r") as f:
+                return {**self._default_state(), **json.load(f)}
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read {self.state_path}, using defaults: {e}")
+            return self._default_state()
+
+    @property
+    def active(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._state)
+
+    @property
+    def version(self) -> int:
+        return self._state["version"]
+
+    def resolve_embedding_model(self, collection: Optional[Any]) -> Dict[str, Any]:
+        """Fill in an unset embedding model from what the live collection was built with"""
+        with self._lock:
+            if self._state["embedding_model"] is None:
+                self._state = {**self._state, "embedding_model": recorded_embedding_model(collection)}
+                logger.info(
+                    f"📝 [INDEX] Using embedding model '{self._state['embedding_model']}' "
+                    f"for '{self._state['collection_name']}'"
+                )
+            return dict(self._state)
+
+    def next_collection_name(self) -> str:
+        return f"{RAGConfig.COLLECTION_NAME}_v{self.version + 1}"
+
+    def activate(self, collection_name: str, embedding_model: str, chunk_size: int,
+                 chunk_overlap: int, projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Persist and switch to a new live collection"""
+        with self._lock:
+            state = {
+                "collection_name": collection_name,
+                "embedding_model": embedding_model,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "projection": projection,
+                "version": self._state["version"] + 1,
+                "activated_at": datetime.now().isoformat()
+            }
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.state_path.with_suffix(".json.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(temp_path, self.state_path)
+            # Single reference swap: readers see either the old or the new state
+            self._state = state
+
+        logger.info(f"🔀 [INDEX] Active collection is now '{collection_name}' (version {state['version']})")
+        return dict(state)
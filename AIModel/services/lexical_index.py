@@ -0,0 +1,170 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from langchain.schema import Document
+
+from services.retrieval_scope import UNTENANTED, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in", "is",
+    "it", "me", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when",
+    "where", "which", "who", "why", "with", "you", "your", "do", "does", "can", "tell", "about"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over the RAG chunks, kept alongside Chroma.
+    IngestionService updates it incrementally on ingest and delete; it is
+    rebuilt from the collection at startup and after an index swap.
+    Lexical search needs no embedding call.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._chunk_lengths: Dict[str, int] = {}
+        self._chunks: Dict[str, Dict[str, Any]] = {}
+        self._chunks_by_doc: Dict[str, List[str]] = defaultdict(list)
+        self._total_length = 0
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    def add_chunk(self, chunk_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        metadata = metadata or {}
+        with self._lock:
+            if chunk_id in self._chunks:
+                self._remove_chunk(chunk_id)
+
+            term_counts = Counter(tokenize(text))
+            for term, count in term_counts.items():
+                self._postings[term][chunk_id] = count
+            length = sum(term_counts.values())
+            self._chunk_lengths[chunk_id] = length
+            self._total_length += length
+            self._chunks[chunk_id] = {"text": text, "metadata": metadata, "terms": list(term_counts)}
+            self._chunks_by_doc[str(metadata.get("doc_id", "unknown"))].append(chunk_id)
+
+    def add_documents(self, chunk_ids: List[str], documents: List[Document]):
+        for chunk_id, document in zip(chunk_ids, documents):
+            self.add_chunk(chunk_id, document.page_content, document.metadata)
+
+    def remove_doc(self, doc_id: str) -> int:
+        with self._lock:
+            chunk_ids = self._chunks_by_doc.pop(str(doc_id), [])
+            for chunk_id in chunk_ids:
+                self._remove_chunk(chunk_id, keep_doc_entry=True)
+            return len(chunk_ids)
+
+    def _remove_chunk(self, chunk_id: str, keep_doc_entry: bool = False):
+        chunk = self._chunks.pop(chunk_id, None)
+        if chunk is None:
+            return
+        for term in chunk["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._chunk_lengths.pop(chunk_id, 0)
+        if not keep_doc_entry:
+            doc_id = str(chunk["metadata"].get("doc_id", "unknown"))
+            if chunk_id in self._chunks_by_doc.get(doc_id, []):
+                self._chunks_by_doc[doc_id].remove(chunk_id)
+
+    def rebuild(self, *collections: Any):
+        """Re-read every chunk from the Chroma collection (and its tenant shards)"""
+        results = [collection.get(include=["documents", "metadatas"]) for collection in collections]
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._chunk_lengths = {}
+            self._chunks = {}
+            self._chunks_by_doc = defaultdict(list)
+            self._total_length = 0
+            for result in results:
+                for chunk_id, text, metadata in zip(
+                    result.get("ids") or [], result.get("documents") or [], result.get("metadatas") or []
+                ):
+                    self.add_chunk(chunk_id, text or "", metadata or {})
+        logger.info(f"🔤 [BM25] Indexed {self.chunk_count} chunks")
+
+    def adopt(self, other: "BM25Index"):
+        """Take over the postings of an index built off to the side (O(1) swap)"""
+        with other._lock:
+            state = (other._postings, other._chunk_lengths, other._chunks, other._chunks_by_doc, other._total_length)
+        with self._lock:
+            self._postings, self._chunk_lengths, self._chunks, self._chunks_by_doc, self._total_length = state
+
+    def search(self, query: str, k: int = 5, doc_ids: Optional[List[str]] = None,
+               tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to k hits as {"id", "document", "score"}, best first, restricted to the
+        given documents and to the tenant (untenanted chunks when `tenant_id` is None)
+        """
+        terms = tokenize(query)
+        with self._lock:
+            chunk_total = len(self._chunks)
+            if not terms or chunk_total == 0:
+                return []
+            average_length = self._total_length / chunk_total
+
+            allowed = None
+            if doc_ids:
+                allowed = {chunk_id for doc_id in doc_ids for chunk_id in self._chunks_by_doc.get(str(doc_id), [])}
+            tenant = tenant_scope(tenant_id)
+
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (chunk_total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    if allowed is not None and chunk_id not in allowed:
+                        continue
+                    if (self._chunks[chunk_id]["metadata"].get("tenant_id") or UNTENANTED) != tenant:
+                        continue
+                    length_norm = 1 - self.b + self.b * self._chunk_lengths[chunk_id] / average_length
+                    scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [
+                {
+                    "id": chunk_id,
+                    "document": Document(
+                        page_content=self._chunks[chunk_id]["text"],
+                        metadata=dict(self._chunks[chunk_id]["metadata"])
+                    ),
+                    "score": score
+                }
+                for chunk_id, score in ranked
+            ]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k0: int = 60) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked hit lists by summing 1 / (k0 + rank); hits are matched by chunk id.
+    A fused hit carries the fields of every list it appeared in (e.g. both the dense
+    "similarity" and the BM25 "score"), first list winning on shared keys.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit["id"], {**hit, "rrf_score": 0.0})
+            for key, value in hit.items():
+                entry.setdefault(key, value)
+            entry["rrf_score"] += 1.0 / (k0 + rank)
+    return sorted(fused.values(), key=lambda hit: hit["rrf_score"], reverse=True)
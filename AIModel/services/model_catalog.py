@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.ollama_config import OllamaConfig
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaModelCatalog:
+    """
+    Caches the list of models installed in Ollama and the resolved vision model.
+    The list is refreshed in the background every `ttl` seconds so image chats
+    never wait on a `client.list()` round trip. A change in the installed model
+    set (pull or removal) is detected by fingerprint and re-resolves the vision model.
+    """
+    def __init__(self, connection, ttl: float = OllamaConfig.MODEL_CATALOG_TTL,
+                 vision_models: Optional[List[str]] = None):
+        self.connection = connection
+        self.ttl = ttl
+        self.vision_models = vision_models or OllamaConfig.VISION_MODELS
+
+        self._model_names: List[str] = []
+        self._fingerprint: Optional[Tuple] = None
+        self._vision_model: Optional[str] = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._pending_refresh: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._fingerprint is not None
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._refreshed_at > self.ttl
+
+    async def start(self):
+        """Load the catalog once and start the background refresh loop"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"⚠️ [CATALOG] Initial model list failed: {e}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._pending_refresh is not None and not self._pending_refresh.done():
+            self._pending_refresh.cancel()
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ [CATALOG] Background refresh failed: {e}")
+
+    async def refresh(self) -> bool:
+        """Fetch the model list from Ollama. Returns True if the installed set changed."""
+        async with self._lock:
+            response = await self.connection.get_client().list()
+            return self.update_from_list(response)
+
+    def update_from_list(self, response: Any) -> bool:
+        """Apply a `client.list()` response (also used by /health to keep the cache warm)"""
+        models = self._extract_models(response)
+        fingerprint = tuple(sorted(
+            (entry["name"], entry["digest"]) for entry in models
+        ))
+        self._refreshed_at = time.monotonic()
+
+        if fingerprint == self._fingerprint:
+            return False
+
+        if self._fingerprint is not None:
+            logger.info(f"🔄 [CATALOG] Installed models changed, re-resolving vision model")
+
+        self._fingerprint = fingerprint
+        self._model_names = [entry["name"] for entry in models]
+        self._vision_model = self._resolve_vision_model(self._model_names)
+        logger.info(f"📚 [CATALOG] {len(self._model_names)} models cached, vision model: {self._vision_model}")
+        return True
+
+    def invalidate(self):
+        """Force the next lookup to re-list models (e.g. after a model-not-found error)"""
+        self._fingerprint = None
+        self._refreshed_at = 0.0
+        logger.info("🗑️ [CATALOG] Model catalog invalidated")
+
+    async def get_vision_model(self) -> Optional[str]:
+        """
+        Return the cached vision model. Only blocks when nothing has been loaded yet;
+        a stale cache is served immediately while a refresh runs in the background.
+        """
+        if not self.is_loaded:
+            await self.refresh()
+        elif self.is_stale and (self._pending_refresh is None or self._pending_refresh.done()):
+            self._pending_refresh = asyncio.create_task(self._background_refresh())
+        return self._vision_model
+
+    def get_model_names(self) -> List[str]:
+        return list(self._model_names)
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"⚠️ [CATALOG] Refresh failed, serving cached models: {e}")
+
+    def _resolve_vision_model(self, model_names: List[str]) -> Optional[str]:
+        for model in self.vision_models:
+            if any(model in available_model for available_model in model_names):
+                return model
+
+        # Try partial matches
+        for model_name in model_names:
+            if any(keyword in model_name.lower() for keyword in OllamaConfig.VISION_MODEL_KEYWORDS):
+                return model_name
+
+        return None
+
+    @staticmethod
+    def _extract_models(response: Any) -> List[Dict[str, str]]:
+        raw_models = getattr(response, "models", None)
+        if raw_models is None and isinstance(response, dict):
+            raw_models = response.get("models", [])
+
+        models = []
+        for model in raw_models or []:
+            if isinstance(model, dict):
+                name = model.get("model") or model.get("name")
+                digest = model.get("digest", "")
+            else:
+                name = getattr(model, "model", None) or getattr(model, "name", None)
+                digest = getattr(model, "digest", "") or ""
+            if name:
+                models.append({"name": name, "digest": digest})
+        return models
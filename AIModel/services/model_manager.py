@@ -3,13 +3,36 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_ollama import OllamaEmbeddings, OllamaLLM
-from langchain_chroma import Chroma
 from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
+from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
+
+from config.rag_config import RAGConfig
+from services.vector_stats import VectorStoreStats
+from services.collection_metadata import ensure_embedding_compatibility, probe_embedding_dimension
+from services.index_registry import IndexRegistry
+from services.embedding_cache import CachedQueryEmbeddings, QueryEmbeddingCache
+from services.embedding_batcher import EmbeddingBatcher
+from services.lexical_index import BM25Index, reciprocal_rank_fusion
+from services.retrieval_scope import build_where_filter, tag_untenanted_chunks
+from services.collection_router import CollectionRouter
+from services.document_index import DocumentIndex
+from services.quantized_index import QUANTIZATION_MODES, QuantizedIndex
+from services.vector_projection import build_embeddings, embedding_key, recall_report
+from services.vector_store import VectorStoreService
+from services.context_selection import (
+    cosine_similarities,
+    filter_relevant_hits,
+    fit_token_budget,
+    merge_adjacent_chunks,
+    mmr_select
+)
 
 # ✅ FIX: Import with fallbacks for ML dependencies
 try:
@@ -28,37 +51,239 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+NO_DOCUMENTS_MESSAGE = """I don't have any documents in my knowledge base yet. 
+
+To use RAG features:
+1. Go to Admin → Model Management 
+2. Upload documents in the "Data Sheets" tab
+3. Wait for successful ingestion
+4. Then ask questions about your documents
+
+For now, I'll provide a general response to your question."""
+
 class ModelManager:
     """
     Manages the Ollama model and the Retrieval-Augmented Generation (RAG) pipeline.
     This class orchestrates document retrieval and context-aware response generation.
     """
-    def __init__(self, ollama_model="llama3"):
+    def __init__(self, ollama_model="llama3", index_registry: Optional[IndexRegistry] = None):
         self.ollama_model_name = ollama_model
         
-        # 1. Initialize the embedding model for creating vectors from text
-        self.embeddings = OllamaEmbeddings(model=self.ollama_model_name)
-        logger.info(f"✅ OllamaEmbeddings model initialized: {self.ollama_model_name}")
-
-        # 2. Initialize the vector store (ChromaDB) to retrieve relevant document chunks
-        self.vectorstore = Chroma(
-            collection_name="company_data",
-            embedding_function=self.embeddings,
-            persist_directory="./chroma_db"
+        # The registry says which collection / embedding model is live; a migration
+        # bumps its version and the handles below are re-opened on next access.
+        self.index_registry = index_registry or IndexRegistry()
+        self.vector_stats = VectorStoreStats()  # Chunk/document counters shared with IngestionService
+        self.lexical_index = BM25Index()  # BM25 inverted index, also shared with IngestionService
+        # One vector-store client and one handle per collection for the whole process (shared too)
+        self.vector_service = VectorStoreService()
+        self.collection_router = CollectionRouter(self.vector_service)  # Per-tenant shards (RAG_TENANT_SHARDING)
+        self.document_index = DocumentIndex(lambda: self.vector_service.client)  # Per-document centroids
+        # Optional int8/fp16 first-stage index beside each Chroma collection (RAG_VECTOR_QUANTIZATION);
+        # the numpy backend stores its own collections quantized instead
+        self.quantized_index = (
+            QuantizedIndex(RAGConfig.VECTOR_QUANTIZATION)
+            if RAGConfig.VECTOR_QUANTIZATION in QUANTIZATION_MODES and RAGConfig.VECTOR_BACKEND != "numpy" else None
         )
-        logger.info("✅ ChromaDB vector store initialized")
+        self.query_embedding_cache = QueryEmbeddingCache()
+        self.embeddings = None
+        self.query_embeddings = None
+        self.embedding_batcher = None
+        self.embedding_model_name = None
+        self.embedding_dimension = None
+        self._vectorstore = None
+        self._index_version = None
+        # Opens are serialized by _open_lock (never waited on by a search holding the read lock);
+        # _index_lock only guards publishing/snapshotting the opened handles
+        self._open_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        
+        # 1-2. Initialize the dedicated embedding model and the vector store (ChromaDB).
+        # A failure (e.g. Ollama not up yet) is retried on first use instead of disabling RAG.
+        try:
+            self._open_active_index()
+        except Exception as e:
+            logger.warning(f"⚠️ RAG index not opened yet, will retry on first use: {e}")
 
         # 3. Initialize the Ollama LLM for generating responses
         self.llm = OllamaLLM(model=self.ollama_model_name)
         logger.info(f"✅ Ollama LLM initialized: {self.ollama_model_name}")
 
-        # 4. Create the RetrievalQA chain
-        self.qa_chain = self._initialize_qa_chain()
+        # 4. Create the QA prompt (retrieval happens once per query in _retrieve_documents)
+        self.qa_prompt = self._initialize_qa_prompt()
+
+        # 5. Keep blocking vector-store work off the event loop
+        self._rag_executor = ThreadPoolExecutor(
+            max_workers=RAGConfig.EXECUTOR_WORKERS,
+            thread_name_prefix="rag"
+        )
+        self._rag_semaphore = asyncio.Semaphore(RAGConfig.MAX_CONCURRENCY)
+        self.active_rag_requests = 0  # Background index jobs back off while this is > 0
+        logger.info(f"✅ RAG executor ready (workers={RAGConfig.EXECUTOR_WORKERS}, concurrency={RAGConfig.MAX_CONCURRENCY})")
 
-    def _initialize_qa_chain(self):
+    @property
+    def vectorstore(self) -> VectorStore:
+        """The live collection (Chroma or numpy backend), re-opened after an index migration swap"""
+        if self._index_version != self.index_registry.version:
+            self._open_active_index()
+        return self._vectorstore
+
+    def _open_active_index(self):
+        with self._open_lock:
+            state = self.index_registry.active
+            if self._index_version == state["version"]:
+                return
+            if state["embedding_model"] is None:
+                state = self.index_registry.resolve_embedding_model(
+                    self.vector_service.find_collection(state["collection_name"])
+                )
+            self._publish_index(self._prepare_index(state), state["version"])
+
+    def _prepare_index(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Creates and returns the RetrievalQA chain. This chain handles the end-to-end
-        RAG process: retrieval and generation.
+        Everything a switch to `state` (collection_name, embedding_model, projection) needs,
+        built without touching the live handles: embedder, collection, tenant tags, counters and
+        fresh BM25 / quantized / document indexes. The O(N) part of a switch; an index migration
+        runs it before holding off ingests, then hands the result to both services.
+        """
+        # Built into fresh objects and published together, so a search never pairs
+        # the new embedder with the old collection (or the reverse)
+        embeddings, dimension = self.embeddings, self.embedding_dimension
+        batcher, query_embeddings = self.embedding_batcher, self.query_embeddings
+        # The model name carries the projection suffix (e.g. "+pca256") when vectors are reduced
+        model_key = embedding_key(state["embedding_model"], state.get("projection"))
+        if model_key != self.embedding_model_name:
+            embeddings = build_embeddings(state["embedding_model"], state.get("projection"))
+            dimension = probe_embedding_dimension(embeddings, model_key)
+            # Retrieval consults the query-embedding LRU, then the micro-batcher, before Ollama
+            batcher = EmbeddingBatcher(embeddings)
+            query_embeddings = CachedQueryEmbeddings(
+                embeddings, model_key, self.query_embedding_cache, batcher=batcher
+            )
+            logger.info(f"✅ OllamaEmbeddings model initialized: {model_key} ({dimension}-d)")
+        
+        vectorstore = self.vector_service.open(state["collection_name"], embeddings, model_key)
+        # Refuse to query a collection built with a different embedder
+        ensure_embedding_compatibility(vectorstore._collection, model_key, dimension)
+        collections = self._with_shards(vectorstore._collection)
+        
+        try:
+            # Legacy chunks without a tenant_id get the untenanted tag before anything is searched.
+            # Safe to wait for the write lock here: searches never take _open_lock
+            with self.vector_service.write():
+                for collection in collections:
+                    tag_untenanted_chunks(collection)
+        except Exception as e:
+            logger.warning(f"⚠️ Tenant tagging failed: {e}")
+        
+        vector_stats = VectorStoreStats()
+        try:
+            vector_stats.reconcile(*collections)
+        except Exception as e:
+            logger.warning(f"⚠️ Vector stats reconcile failed: {e}")
+        
+        lexical_index = BM25Index(self.lexical_index.k1, self.lexical_index.b)
+        try:
+            lexical_index.rebuild(*collections)
+        except Exception as e:
+            logger.warning(f"⚠️ Lexical index rebuild failed: {e}")
+        
+        quantized_index = None
+        if self.quantized_index is not None:
+            quantized_index = self.quantized_index.spawn()
+            try:
+                quantized_index.open(state["collection_name"], *collections)
+            except Exception as e:
+                logger.warning(f"⚠️ Quantized index open failed: {e}")
+        
+        document_index = None
+        if RAGConfig.HIERARCHICAL_RETRIEVAL:
+            document_index = DocumentIndex(lambda: self.vector_service.client)
+            try:
+                document_index.open(state["collection_name"], model_key, dimension, *collections)
+            except Exception as e:
+                logger.warning(f"⚠️ Document index open failed: {e}")
+        
+        return {
+            "state": state,
+            "embeddings": embeddings,
+            "embedding_model_name": model_key,
+            "embedding_dimension": dimension,
+            "embedding_batcher": batcher,
+            "query_embeddings": query_embeddings,
+            "vectorstore": vectorstore,
+            "vector_stats": vector_stats,
+            "lexical_index": lexical_index,
+            "quantized_index": quantized_index,
+            "document_index": document_index
+        }
+
+    def _publish_index(self, prepared: Dict[str, Any], version: int):
+        """
+        Swap a prepared index in: O(1) state handovers into the shared side-index objects
+        (IngestionService holds the same ones), then the handles. Caller holds _open_lock.
+        """
+        # Shard handles belong to the previous collection / embedding model
+        self.collection_router.clear()
+        self.vector_stats.adopt(prepared["vector_stats"])
+        self.lexical_index.adopt(prepared["lexical_index"])
+        if prepared["quantized_index"] is not None:
+            self.quantized_index.adopt(prepared["quantized_index"])
+        if prepared["document_index"] is not None:
+            self.document_index.adopt(prepared["document_index"])
+        with self._index_lock:
+            self.embeddings = prepared["embeddings"]
+            self.embedding_model_name = prepared["embedding_model_name"]
+            self.embedding_dimension = prepared["embedding_dimension"]
+            self.embedding_batcher = prepared["embedding_batcher"]
+            self.query_embeddings = prepared["query_embeddings"]
+            self._vectorstore = prepared["vectorstore"]
+            self._index_version = version
+        logger.info(f"✅ Vector store initialized ({RAGConfig.VECTOR_BACKEND}): {prepared['state']['collection_name']}")
+
+    def _activate_prepared(self, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make a prepared index the live one: registry switch and publish in one step, under
+        _open_lock so no search starts a rebuild of the new collection in between
+        """
+        state = prepared["state"]
+        with self._open_lock:
+            active = self.index_registry.activate(
+                state["collection_name"], state["embedding_model"], state["chunk_size"], state["chunk_overlap"],
+                projection=state.get("projection")
+            )
+            self._publish_index(prepared, active["version"])
+        return active
+
+    def _active_collection(self) -> Tuple[Any, Any, Any]:
+        """
+        (index version, base collection, query embedder) of the live index, opened first if a
+        migration swapped it. Never call this under vector_service.read(): opening takes write().
+        """
+        if self._index_version != self.index_registry.version:
+            self._open_active_index()
+        with self._index_lock:
+            return self._index_version, self._vectorstore._collection, self.query_embeddings
+
+    def _with_shards(self, collection: Any) -> List[Any]:
+        """The collection plus its tenant shards when sharding is enabled"""
+        if not RAGConfig.TENANT_SHARDING:
+            return [collection]
+        return [collection] + self.collection_router.shard_collections(collection.name)
+
+    def _collection_for(self, base: Any, tenant_id: Optional[str]) -> Optional[Any]:
+        """Collection to search for a tenant: its shard (None if it has none yet) or the shared `base` one"""
+        if not RAGConfig.TENANT_SHARDING or not tenant_id:
+            return base
+        shard = self.collection_router.get(
+            base.name, tenant_id, self.query_embeddings, self.embedding_model_name, self.embedding_dimension
+        )
+        return shard._collection if shard is not None else None
+
+    def _initialize_qa_prompt(self) -> PromptTemplate:
+        """
+        Creates the prompt used to answer from retrieved context. Documents are
+        retrieved once per query and formatted into this prompt directly, so the
+        query is embedded and searched only a single time.
         """
         prompt_template = """
         Based on the following context, analyze the user's question and provide a comprehensive answer.
@@ -74,17 +299,178 @@ class ModelManager:
         QA_PROMPT = PromptTemplate(
             template=prompt_template, input_variables=["context", "question"]
         )
+        logger.info("✅ QA prompt initialized")
+        return QA_PROMPT
+
+    def _retrieve_documents(self, prompt: str, doc_ids: Optional[List[str]] = None,
+                            tenant_id: Optional[str] = None) -> List[Any]:
+        """Single embedding + search for a query (blocking; used by get_rag_response)"""
+        version, collection, query_embeddings = self._active_collection()
+        while True:
+            embedding = None
+            if RAGConfig.RETRIEVAL_MODE != "lexical":
+                embedding = query_embeddings.embed_query(prompt)
+            if version == self.index_registry.version:
+                break
+            # Swapped by a migration while embedding: the vector may come from the old model
+            version, collection, query_embeddings = self._active_collection()
+        return self._search(prompt, embedding, collection, doc_ids, tenant_id)
+
+    async def _aretrieve_documents(self, prompt: str, doc_ids: Optional[List[str]] = None,
+                                   tenant_id: Optional[str] = None) -> List[Any]:
+        """
+        Async retrieval: the query embedding is awaited on the event loop (cache, then
+        a micro-batched Ollama call) and only the index searches run on the executor.
+        Lexical mode skips the embedding call entirely.
+        """
+        # Not opened yet (or swapped by a migration): open before using the embedder
+        version, collection, query_embeddings = await self._run_blocking(self._active_collection)
+        while True:
+            embedding = None
+            if RAGConfig.RETRIEVAL_MODE != "lexical":
+                embedding = await query_embeddings.aembed_query(prompt)
+            if version == self.index_registry.version:
+                break
+            # Swapped by a migration while embedding: the vector may come from the old model
+            version, collection, query_embeddings = await self._run_blocking(self._active_collection)
+        return await self._run_blocking(self._search, prompt, embedding, collection, doc_ids, tenant_id)
+
+    def _search(self, prompt: str, embedding: Optional[List[float]], collection: Any,
+                doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> List[Any]:
+        """
+        Vector and/or BM25 search according to RAG_RETRIEVAL_MODE (fused with RRF),
+        restricted to the given documents / tenant, then the post-retrieval stage: relevance threshold, MMR diversification,
+        merging of adjacent chunks (overlap removed) and the prompt token budget.
+        """
+        # Readers share the index; an ingest or delete in progress is seen whole or not at all.
+        # `collection` was resolved beforehand, so nothing under the read lock can trigger an open
+        with self.vector_service.read():
+            return self._search_unlocked(prompt, embedding, collection, doc_ids, tenant_id)
+
+    def _search_unlocked(self, prompt: str, embedding: Optional[List[float]], base: Any,
+                         doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> List[Any]:
+        mode = RAGConfig.RETRIEVAL_MODE
+        top_k = RAGConfig.RETRIEVAL_TOP_K
+        collection = self._collection_for(base, tenant_id)
+        if collection is None:
+            return []
+        
+        dense_doc_ids = doc_ids
+        if (RAGConfig.HIERARCHICAL_RETRIEVAL and embedding is not None and not doc_ids
+                and self.vector_stats.document_count >= RAGConfig.HIERARCHICAL_MIN_DOCUMENTS):
+            # Two-level retrieval: nearest documents by centroid (within the collection searched) first,
+            # then chunks within them. BM25 keeps the full scope so exact-term matches in other documents still surface.
+            dense_doc_ids = self.document_index.top_documents(
+                embedding, RAGConfig.HIERARCHICAL_TOP_DOCUMENTS, collection.name, tenant_id
+            ) or None
+        
+        if mode == "lexical":
+            hits = self.lexical_index.search(prompt, top_k, doc_ids, tenant_id)
+        elif mode == "hybrid":
+            dense_hits = self._dense_search(collection, embedding, RAGConfig.HYBRID_CANDIDATES, dense_doc_ids, tenant_id)
+            lexical_hits = self.lexical_index.search(prompt, RAGConfig.HYBRID_CANDIDATES, doc_ids, tenant_id)
+            hits = reciprocal_rank_fusion([dense_hits, lexical_hits], RAGConfig.RRF_K)[:RAGConfig.HYBRID_CANDIDATES]
+        else:
+            hits = self._dense_search(collection, embedding, RAGConfig.MMR_FETCH_K, dense_doc_ids, tenant_id)
+        
+        if embedding is not None:
+            self._attach_similarities(collection, hits, embedding)
+        hits = filter_relevant_hits(
+            hits, RAGConfig.RELEVANCE_THRESHOLD, RAGConfig.RELEVANCE_MARGIN, RAGConfig.LEXICAL_RELEVANCE_THRESHOLD
+        )
+        hits = mmr_select(hits, top_k, RAGConfig.MMR_LAMBDA, RAGConfig.DUPLICATE_SIMILARITY)
+        documents = merge_adjacent_chunks([hit["document"] for hit in hits])
+        return fit_token_budget(documents, RAGConfig.CONTEXT_TOKEN_BUDGET)
 
-        # The chain combines the retriever and the LLM
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(search_kwargs={"k": 5}), # Retrieve top 5 documents
-            chain_type_kwargs={"prompt": QA_PROMPT},
-            return_source_documents=True
+    def _dense_search(self, collection: Any, embedding: List[float], k: int,
+                      doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Nearest chunks as {"id", "document", "embedding", "similarity"} hits, best first"""
+        if self.quantized_index is not None and self.quantized_index.is_ready:
+            return self._quantized_search(collection, embedding, k, doc_ids, tenant_id)
+        
+        # The `where` filter is pushed down to the store so only in-scope chunks are candidates
+        results = collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=build_where_filter(doc_ids, tenant_id),
+            include=["documents", "metadatas", "embeddings"]
         )
-        logger.info("✅ RetrievalQA chain initialized")
-        return qa_chain
+        embeddings = results["embeddings"][0]
+        similarities = cosine_similarities(embedding, embeddings)
+        return [
+            {
+                "id": chunk_id,
+                "document": Document(page_content=text or "", metadata=metadata or {}),
+                "embedding": chunk_embedding,
+                "similarity": similarity
+            }
+            for chunk_id, text, metadata, chunk_embedding, similarity in zip(
+                results["ids"][0], results["documents"][0], results["metadatas"][0], embeddings, similarities
+            )
+        ]
+
+    def _quantized_search(self, collection: Any, embedding: List[float], k: int,
+                          doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Shortlist from the queried collection's own quantized index, re-scored exactly
+        against Chroma's vectors; only the shortlist's rows are fetched from Chroma.
+        """
+        shortlist = self.quantized_index.search(collection.name, embedding, k, doc_ids, tenant_id)
+        if not shortlist:
+            return []
+        results = collection.get(ids=shortlist, include=["documents", "metadatas", "embeddings"])
+        similarities = cosine_similarities(embedding, results["embeddings"])
+        hits = [
+            {
+                "id": chunk_id,
+                "document": Document(page_content=text or "", metadata=metadata or {}),
+                "embedding": chunk_embedding,
+                "similarity": similarity
+            }
+            for chunk_id, text, metadata, chunk_embedding, similarity in zip(
+                results["ids"], results["documents"], results["metadatas"], results["embeddings"], similarities
+            )
+        ]
+        hits.sort(key=lambda hit: hit["similarity"], reverse=True)
+        return hits[:k]
+
+    async def arebuild_quantized_index(self) -> Dict[str, Any]:
+        """Re-convert the live collection's float vectors into the quantized index in place"""
+        if self.quantized_index is None:
+            raise RuntimeError(
+                "No quantized index: set RAG_VECTOR_QUANTIZATION to int8 or fp16 "
+                "(the numpy backend quantizes its collections at creation instead)"
+            )
+        collections = await self._run_blocking(self._with_shards, self.vectorstore._collection)
+        self.quantized_index.collection_name = self.vectorstore._collection.name
+        await self._run_blocking(self.quantized_index.rebuild, *collections)
+        return self.quantized_index.stats()
+
+    async def aprojection_report(self, kind: str, dimensions: List[int], k: int = 10,
+                                 sample: int = 200) -> Dict[str, Any]:
+        """Recall@k of the live collection's vectors after PCA/truncation to each dimension"""
+        def build_report():
+            results = self.vectorstore._collection.get(limit=RAGConfig.PROJECTION_FIT_SAMPLE, include=["embeddings"])
+            return recall_report(results["embeddings"], dimensions, kind=kind, k=k, sample=sample)
+        return await self._run_blocking(build_report)
+
+    def _attach_similarities(self, collection: Any, hits: List[Dict[str, Any]], embedding: List[float]):
+        """Score lexical-only hits against the query embedding so every hit is thresholded alike"""
+        missing = [hit for hit in hits if hit.get("similarity") is None]
+        if not missing:
+            return
+        results = collection.get(ids=[hit["id"] for hit in missing], include=["embeddings"])
+        vectors = dict(zip(results["ids"], results["embeddings"]))
+        found = [hit for hit in missing if hit["id"] in vectors]
+        similarities = cosine_similarities(embedding, [vectors[hit["id"]] for hit in found])
+        for hit, similarity in zip(found, similarities):
+            hit["embedding"] = vectors[hit["id"]]
+            hit["similarity"] = similarity
+
+    def _build_rag_prompt(self, prompt: str, relevant_docs: List[Any]) -> str:
+        """Stuff the retrieved chunks into the QA prompt"""
+        context = "\n\n".join(doc.page_content for doc in relevant_docs)
+        return self.qa_prompt.format(context=context, question=prompt)
 
     async def get_all_loaded_models(self) -> List[Dict[str, Any]]:
         """Return all currently loaded models with consistent structure"""
@@ -328,30 +714,22 @@ class ModelManager:
         
         return should_rag
 
-    def get_rag_response(self, prompt: str, conversation_context: List[Any]) -> str:
+    def get_rag_response(self, prompt: str, conversation_context: List[Any],
+                         doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> str:
         """Enhanced RAG response with better error handling and document verification"""
         try:
             logger.info(f"🔍 [RAG] Processing query: {prompt[:100]}...")
             
             # ✅ STEP 1: Check if we have any documents in the vector store
             try:
-                # Get collection info to check document count
-                collection = self.vectorstore._collection
-                collection_count = collection.count()
+                # Cached counters; no collection.count() round trip per query
+                collection_count = self._get_chunk_count()
                 
                 logger.info(f"📊 [RAG] Vector store has {collection_count} documents")
                 
                 if collection_count == 0:
                     logger.warning("⚠️ [RAG] No documents found in vector store")
-                    return """I don't have any documents in my knowledge base yet. 
-
-To use RAG features:
-1. Go to Admin → Model Management 
-2. Upload documents in the "Data Sheets" tab
-3. Wait for successful ingestion
-4. Then ask questions about your documents
-
-For now, I'll provide a general response to your question."""
+                    return NO_DOCUMENTS_MESSAGE
                 
             except Exception as e:
                 logger.error(f"❌ [RAG] Vector store access failed: {e}")
@@ -360,21 +738,14 @@ For now, I'll provide a general response to your question."""
             # ✅ STEP 2: Perform retrieval to get relevant documents
             try:
                 logger.info(f"🔍 [RAG] Searching for relevant documents...")
-                retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-                relevant_docs = retriever.get_relevant_documents(prompt)
+                relevant_docs = self._retrieve_documents(prompt, doc_ids, tenant_id)
                 
                 logger.info(f"📄 [RAG] Found {len(relevant_docs)} potentially relevant documents")
                 
                 if not relevant_docs:
-                    logger.warning("⚠️ [RAG] No relevant documents found for this query")
-                    return f"""I searched through your uploaded documents but couldn't find information specifically related to your question: "{prompt}"
-
-This might be because:
-- The information isn't in your uploaded documents
-- The question needs to be more specific
-- The documents need better indexing
-
-I can provide a general answer, or you can try rephrasing your question to be more specific."""
+                    # Nothing cleared the relevance threshold: answer without stuffing context
+                    logger.warning("⚠️ [RAG] No relevant documents found for this query - using general knowledge")
+                    return self.llm.invoke(prompt) + self._build_source_footer([])
                 
                 # Log what documents were found (for debugging)
                 for i, doc in enumerate(relevant_docs):
@@ -386,31 +757,14 @@ I can provide a general answer, or you can try rephrasing your question to be mo
                 logger.error(f"❌ [RAG] Document retrieval failed: {e}")
                 return f"I encountered an error while searching through your documents: {str(e)}"
             
-            # ✅ STEP 3: Generate response using the QA chain
+            # ✅ STEP 3: Generate response from the documents retrieved above
             try:
                 logger.info(f"🤖 [RAG] Generating response using {len(relevant_docs)} documents...")
                 
-                result = self.qa_chain.invoke({"query": prompt})
-                answer = result["result"]
+                answer = self.llm.invoke(self._build_rag_prompt(prompt, relevant_docs))
                 
                 # ✅ STEP 4: Enhance the response with metadata
-                source_docs = result.get("source_documents", relevant_docs)
-                
-                if source_docs:
-                    # Get unique document IDs
-                    doc_ids = list(set(doc.metadata.get('doc_id', 'unknown') for doc in source_docs))
-                    doc_ids = [doc_id for doc_id in doc_ids if doc_id != 'unknown']
-                    
-                    logger.info(f"✅ [RAG] Response generated using documents: {doc_ids}")
-                    
-                    # Add source information
-                    if doc_ids:
-                        answer += f"\n\n📚 *Based on information from your uploaded documents (IDs: {', '.join(doc_ids)}).*"
-                    else:
-                        answer += f"\n\n📚 *Based on {len(source_docs)} document sections from your knowledge base.*"
-                else:
-                    logger.warning("⚠️ [RAG] No source documents in result")
-                    answer += "\n\n*Note: I provided this answer using general knowledge as I couldn't find specific information in your documents.*"
+                answer += self._build_source_footer(relevant_docs)
                 
                 return answer
                 
@@ -421,3 +775,143 @@ I can provide a general answer, or you can try rephrasing your question to be mo
         except Exception as e:
             logger.error(f"❌ [RAG] Overall RAG process failed: {e}")
             return f"I'm sorry, I encountered an unexpected error while processing your question: {str(e)}. Please try again."
+
+    def _build_source_footer(self, source_docs: List[Any]) -> str:
+        """Source attribution appended to every RAG answer"""
+        if not source_docs:
+            return "\n\n*Note: I provided this answer using general knowledge as I couldn't find specific information in your documents.*"
+        
+        # Get unique document IDs
+        doc_ids = list(set(doc.metadata.get('doc_id', 'unknown') for doc in source_docs))
+        doc_ids = [doc_id for doc_id in doc_ids if doc_id != 'unknown']
+        
+        logger.info(f"✅ [RAG] Response generated using documents: {doc_ids}")
+        
+        if doc_ids:
+            return f"\n\n📚 *Based on information from your uploaded documents (IDs: {', '.join(doc_ids)}).*"
+        return f"\n\n📚 *Based on {len(source_docs)} document sections from your knowledge base.*"
+
+    def _get_chunk_count(self) -> int:
+        """Chunk count from the cached stats, falling back to Chroma until the first reconcile"""
+        if self.vector_stats.is_reconciled:
+            return self.vector_stats.total_chunks
+        return self.vectorstore._collection.count()
+
+    async def areconcile_vector_stats(self):
+        """Re-sync the cached counters with Chroma (run periodically from main.py)"""
+        collections = await self._run_blocking(self._with_shards, self.vectorstore._collection)
+        await self._run_blocking(self.vector_stats.reconcile, *collections)
+
+    async def _run_blocking(self, func, *args):
+        """Run a blocking vector-store call on the dedicated RAG executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._rag_executor, func, *args)
+
+    def close(self):
+        """Release the RAG executor (called on app shutdown)"""
+        self._rag_executor.shutdown(wait=False)
+
+    async def aget_rag_response(self, prompt: str, conversation_context: List[Any],
+                                doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> str:
+        """Non-blocking wrapper around get_rag_response for async callers"""
+        async with self._rag_semaphore:
+            self.active_rag_requests += 1
+            try:
+                return await self._run_blocking(
+                    self.get_rag_response, prompt, conversation_context, doc_ids, tenant_id
+                )
+            finally:
+                self.active_rag_requests -= 1
+
+    async def aretrieve_relevant_documents(self, prompt: str, doc_ids: Optional[List[str]] = None,
+                                           tenant_id: Optional[str] = None) -> Optional[List[Any]]:
+        """
+        Retrieval only: the chunks (within the given documents / tenant, if any) that
+        pass the relevance threshold, [] when nothing is relevant (callers then skip
+        RAG entirely), or None when the knowledge base is empty (callers answer with
+        NO_DOCUMENTS_MESSAGE).
+        """
+        async with self._rag_semaphore:
+            self.active_rag_requests += 1
+            try:
+                if await self._run_blocking(self._get_chunk_count) == 0:
+                    return None
+                return await self._aretrieve_documents(prompt, doc_ids, tenant_id)
+            finally:
+                self.active_rag_requests -= 1
+
+    async def astream_rag_response(self, prompt: str, conversation_context: List[Any],
+                                   relevant_docs: Optional[List[Any]] = None,
+                                   doc_ids: Optional[List[str]] = None,
+                                   tenant_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streaming RAG: retrieves context once (unless `relevant_docs` were already
+        retrieved), then yields LLM tokens as they are generated, followed by the
+        source-document footer. Same text contract as the plain Ollama stream in main.py.
+        """
+        async with self._rag_semaphore:
+            self.active_rag_requests += 1
+            try:
+                async for chunk in self._astream_rag_response(
+                    prompt, conversation_context, relevant_docs, doc_ids, tenant_id
+                ):
+                    yield chunk
+            finally:
+                self.active_rag_requests -= 1
+
+    async def _astream_rag_response(self, prompt: str, conversation_context: List[Any],
+                                    relevant_docs: Optional[List[Any]] = None,
+                                    doc_ids: Optional[List[str]] = None,
+                                    tenant_id: Optional[str] = None) -> AsyncIterator[str]:
+        try:
+            logger.info(f"🔍 [RAG STREAM] Processing query: {prompt[:100]}...")
+            
+            if relevant_docs is None:
+                try:
+                    collection_count = await self._run_blocking(self._get_chunk_count)
+                    logger.info(f"📊 [RAG STREAM] Vector store has {collection_count} documents")
+                    if collection_count == 0:
+                        logger.warning("⚠️ [RAG STREAM] No documents found in vector store")
+                        yield NO_DOCUMENTS_MESSAGE
+                        return
+                except Exception as e:
+                    logger.error(f"❌ [RAG STREAM] Vector store access failed: {e}")
+                    yield "I'm having trouble accessing the document database. Please try again later."
+                    return
+                
+                try:
+                    relevant_docs = await self._aretrieve_documents(prompt, doc_ids, tenant_id)
+                    logger.info(f"📄 [RAG STREAM] Found {len(relevant_docs)} potentially relevant documents")
+                except Exception as e:
+                    logger.error(f"❌ [RAG STREAM] Document retrieval failed: {e}")
+                    yield f"I encountered an error while searching through your documents: {str(e)}"
+                    return
+            
+            if not relevant_docs:
+                # Nothing cleared the relevance threshold: answer without stuffing context
+                logger.warning("⚠️ [RAG STREAM] No relevant documents found for this query - using general knowledge")
+                async for token in self.llm.astream(prompt):
+                    if token:
+                        yield token
+                yield self._build_source_footer([])
+                return
+            
+            llm_prompt = self._build_rag_prompt(prompt, relevant_docs)
+            
+            chunk_count = 0
+            try:
+                async for token in self.llm.astream(llm_prompt):
+                    if token:
+                        chunk_count += 1
+                        yield token
+            except Exception as e:
+                logger.error(f"❌ [RAG STREAM] Response generation failed: {e}")
+                yield f"\n\nI found relevant documents but encountered an error while generating the response: {str(e)}. Please try rephrasing your question."
+                return
+            
+            logger.info(f"✅ [RAG STREAM] Streamed {chunk_count} chunks using {len(relevant_docs)} documents")
+            yield self._build_source_footer(relevant_docs)
+            
+        except Exception as e:
+            logger.error(f"❌ [RAG STREAM] Overall RAG process failed: {e}")
+            yield f"I'm sorry, I encountered an unexpected error while processing your question: {str(e)}. Please try again."
@@ -0,0 +1,68 @@
+import logging
+from typing import Optional
+
+import httpx
+from ollama import AsyncClient
+
+from config.ollama_config import OllamaConfig
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaConnectionManager:
+    """
+    Owns the single long-lived Ollama AsyncClient shared by every endpoint.
+    The underlying httpx pool keeps connections to the Ollama host alive
+    between requests instead of opening a new one per chat.
+    """
+    def __init__(self, host: str = OllamaConfig.LLAMA_URL):
+        self.host = host
+        self._client: Optional[AsyncClient] = None
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+
+    def _build_client(self) -> AsyncClient:
+        limits = httpx.Limits(
+            max_connections=OllamaConfig.MAX_CONNECTIONS,
+            max_keepalive_connections=OllamaConfig.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OllamaConfig.KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(
+            connect=OllamaConfig.CONNECT_TIMEOUT,
+            read=OllamaConfig.READ_TIMEOUT,
+            write=OllamaConfig.WRITE_TIMEOUT,
+            pool=OllamaConfig.POOL_TIMEOUT
+        )
+        # The connection pool lives in a transport we own, so shutdown closes it through
+        # httpx's public API; extra kwargs are forwarded by ollama to its httpx.AsyncClient
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+        return AsyncClient(host=self.host, timeout=timeout, transport=self._transport)
+
+    async def start(self):
+        """Create the shared client (called from the app lifespan)"""
+        if self._client is None:
+            self._client = self._build_client()
+            logger.info(
+                f"✅ Shared Ollama client ready: {self.host} "
+                f"(max_connections={OllamaConfig.MAX_CONNECTIONS}, "
+                f"keepalive={OllamaConfig.MAX_KEEPALIVE_CONNECTIONS})"
+            )
+
+    def get_client(self) -> AsyncClient:
+        """Return the shared client, creating it lazily if the lifespan hook did not run"""
+        if self._client is None:
+            self._client = self._build_client()
+            logger.info(f"✅ Shared Ollama client created lazily: {self.host}")
+        return self._client
+
+    async def close(self):
+        """Close the pooled connections (called on shutdown)"""
+        if self._client is None:
+            return
+
+        transport, self._client, self._transport = self._transport, None, None
+        try:
+            if transport is not None:
+                await transport.aclose()
+            logger.info("🔌 Shared Ollama client closed")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to close Ollama client cleanly: {e}")
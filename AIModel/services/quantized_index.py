@@ -0,0 +1,163 @@
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.rag_config import RAGConfig
+from services.collection_router import SHARD_SEPARATOR
+from services.retrieval_scope import UNTENANTED, build_where_filter
+from services.vector_store import QUANTIZATION_KEY, MemmapCollection
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("int8", "fp16")
+CONVERT_BATCH_SIZE = 5000
+
+
+def _row_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Only the keys searches are scoped by are kept in the index"""
+    metadata = metadata or {}
+    return {"doc_id": str(metadata.get("doc_id", "unknown")), "tenant_id": metadata.get("tenant_id") or UNTENANTED}
+
+
+class QuantizedIndex:
+    """
+    First-stage search index for the Chroma backend, one per chunk collection (the
+    base collection and each tenant shard are searched separately). Unit vectors are
+    stored as int8 codes with a per-row scale, or as float16, 4x / 2x smaller than
+    float32, and scanned instead of Chroma's HNSW index; only the shortlist's float
+    vectors are read back from Chroma to re-score it, so there is no second float copy.
+    Each index is a MemmapCollection under "{directory}/{collection}": adds append and
+    deletes write tombstones, so keeping it in step costs O(batch), not O(N).
+    The numpy backend stores its collections this way itself and needs no copy.
+    """
+    def __init__(self, mode: str, directory: str = os.path.join(RAGConfig.PERSIST_DIRECTORY, "quantized")):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}' (expected one of {QUANTIZATION_MODES})")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.collection_name: Optional[str] = None
+        self._stores: Dict[str, MemmapCollection] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.collection_name is not None
+
+    @property
+    def row_count(self) -> int:
+        return sum(store.count() for store in list(self._stores.values()))
+
+    def _store(self, collection_name: str) -> MemmapCollection:
+        with self._lock:
+            if collection_name not in self._stores:
+                self._stores[collection_name] = MemmapCollection(
+                    collection_name, self.directory / collection_name, {QUANTIZATION_KEY: self.mode}
+                )
+            return self._stores[collection_name]
+
+    @classmethod
+    def drop(cls, collection_name: str, directory: str = os.path.join(RAGConfig.PERSIST_DIRECTORY, "quantized")):
+        """Remove the indexes of a collection and of its tenant shards"""
+        root = Path(directory)
+        if not root.exists():
+            return
+        for entry in root.iterdir():
+            if entry.name == collection_name or entry.name.startswith(f"{collection_name}{SHARD_SEPARATOR}"):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def open(self, collection_name: str, *collections: Any):
+        """Load the persisted index of each chunk collection; rebuild those whose row count is stale"""
+        with self._lock:
+            self.collection_name = collection_name
+            # Stores already open (e.g. handed over by spawn) are reused, never opened twice
+            previous, self._stores = self._stores, {}
+            try:
+                for collection in collections:
+                    store = self._stores[collection.name] = previous.get(collection.name) or self._store(collection.name)
+                    expected = collection.count()
+                    if store.count() == expected:
+                        logger.info(f"🗜️ [QUANTIZED] Loaded {expected} {self.mode} vectors for {collection.name}")
+                        continue
+                    logger.info(f"🗜️ [QUANTIZED] {collection.name} index is stale ({store.count()} vs {expected} chunks)")
+                    self._convert(store, collection)
+            except Exception:
+                # Not ready: searches fall back to Chroma's own index
+                self.collection_name = None
+                raise
+
+    def spawn(self) -> "QuantizedIndex":
+        """An index to open off to the side (same mode and directory), sharing the stores this one has open"""
+        spawned = QuantizedIndex(self.mode, str(self.directory))
+        with self._lock:
+            spawned._stores = dict(self._stores)
+        return spawned
+
+    def adopt(self, other: "QuantizedIndex"):
+        """Switch to the stores another instance opened off to the side (O(1) swap)"""
+        with other._lock:
+            state = (other.collection_name, dict(other._stores))
+        with self._lock:
+            self.collection_name, self._stores = state
+
+    def rebuild(self, *collections: Any):
+        """Convert the collections' float vectors in place (no re-embedding)"""
+        with self._lock:
+            for collection in collections:
+                self._convert(self._store(collection.name), collection)
+        logger.info(f"🗜️ [QUANTIZED] Converted {self.row_count} vectors of {self.collection_name} to {self.mode}")
+
+    def _convert(self, store: MemmapCollection, collection: Any):
+        stale = store.get(include=[])["ids"]
+        if stale:
+            store.delete(ids=stale)
+        offset = 0
+        while True:
+            results = collection.get(limit=CONVERT_BATCH_SIZE, offset=offset, include=["embeddings", "metadatas"])
+            if not results["ids"]:
+                break
+            store.add(
+                ids=results["ids"], embeddings=results["embeddings"],
+                metadatas=[_row_metadata(metadata) for metadata in results["metadatas"]]
+            )
+            offset += len(results["ids"])
+
+    def add(self, collection_name: str, ids: List[str], embeddings: List[Any], metadatas: List[Dict[str, Any]]):
+        if not self.is_ready or len(ids) == 0:
+            return
+        self._store(collection_name).add(
+            ids=ids, embeddings=embeddings, metadatas=[_row_metadata(metadata) for metadata in metadatas]
+        )
+
+    def remove_doc(self, collection_name: str, doc_id: str):
+        if not self.is_ready:
+            return
+        self._store(collection_name).delete(where={"doc_id": str(doc_id)})
+
+    def search(self, collection_name: str, query_embedding: List[float], k: int,
+               doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> List[str]:
+        """
+        Shortlist of chunk ids of one collection, best first by the quantized score, within
+        the documents / tenant scope: k for fp16, k * RAG_QUANTIZED_RESCORE_FACTOR for int8,
+        for the caller to re-score against the collection's own vectors
+        """
+        n_results = k * RAGConfig.QUANTIZED_RESCORE_FACTOR if self.mode == "int8" else k
+        results = self._store(collection_name).query(
+            query_embeddings=[query_embedding], n_results=n_results,
+            where=build_where_filter(doc_ids, tenant_id), include=[]
+        )
+        return results["ids"][0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "collection": self.collection_name,
+            "collections": len(self._stores),
+            "vectors": self.row_count,
+            "bytes": sum(
+                path.stat().st_size
+                for store in list(self._stores.values()) for path in store.directory.iterdir() if path.is_file()
+            )
+        }
@@ -0,0 +1,96 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.collection_metadata import get_writable_metadata
+
+logger = logging.getLogger(__name__)
+
+# tenant_id stored on chunks ingested without a tenant; untenanted requests only see these
+UNTENANTED = ""
+# Collection metadata flag: every chunk carries a tenant_id (legacy chunks were stamped)
+TENANT_TAGGED_KEY = "tenant_tagged"
+TAG_BATCH_SIZE = 5000
+
+
+def tenant_scope(tenant_id: Optional[str]) -> str:
+    """The stored tenant_id a request is scoped to: its own, or UNTENANTED without one"""
+    return str(tenant_id) if tenant_id else UNTENANTED
+
+
+def build_where_filter(doc_ids: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Chroma `where` clause restricting a search to the given documents and to the
+    request's tenant. Requests without a tenant only match untenanted chunks.
+    """
+    clauses: List[Dict[str, Any]] = [{"tenant_id": tenant_scope(tenant_id)}]
+    if doc_ids:
+        doc_ids = [str(doc_id) for doc_id in doc_ids]
+        clauses.append({"doc_id": doc_ids[0]} if len(doc_ids) == 1 else {"doc_id": {"$in": doc_ids}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def tag_untenanted_chunks(collection: Any):
+    """
+    Stamp tenant_id=UNTENANTED on chunks stored without one (ingested before tenant
+    scoping), since a `where` clause cannot match a missing key. Runs once per
+    collection; the flag is recorded in the collection metadata.
+    """
+    if (collection.metadata or {}).get(TENANT_TAGGED_KEY):
+        return
+    tagged = 0
+    offset = 0
+    while True:
+        results = collection.get(limit=TAG_BATCH_SIZE, offset=offset, include=["metadatas"])
+        ids = results["ids"]
+        if not ids:
+            break
+        untagged = [
+            (chunk_id, metadata or {}) for chunk_id, metadata in zip(ids, results["metadatas"])
+            if "tenant_id" not in (metadata or {})
+        ]
+        if untagged:
+            collection.update(
+                ids=[chunk_id for chunk_id, _ in untagged],
+                metadatas=[{**metadata, "tenant_id": UNTENANTED} for _, metadata in untagged]
+            )
+            tagged += len(untagged)
+        offset += len(ids)
+
+    metadata = get_writable_metadata(collection)
+    metadata[TENANT_TAGGED_KEY] = True
+    collection.modify(metadata=metadata)
+    if tagged:
+        logger.info(f"🏷️ Tagged {tagged} untenanted chunks in collection '{collection.name}'")
+
+
+class SessionScopeStore:
+    """
+    Remembers the retrieval scope (doc_ids, tenant_id) last sent for each chat
+    session, so follow-up messages stay scoped without repeating it. Bounded LRU.
+    """
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._scopes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, session_id: str, doc_ids: Optional[List[str]] = None,
+                tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scope for this request: explicit values win and are remembered for the
+        session (an empty doc_ids list clears the document scope); missing values
+        fall back to what the session used before.
+        """
+        with self._lock:
+            scope = dict(self._scopes.get(session_id) or {"doc_ids": None, "tenant_id": None})
+            if doc_ids is not None:
+                scope["doc_ids"] = [str(doc_id) for doc_id in doc_ids] or None
+            if tenant_id is not None:
+                scope["tenant_id"] = tenant_id or None
+
+            self._scopes[session_id] = scope
+            self._scopes.move_to_end(session_id)
+            while len(self._scopes) > self.max_sessions:
+                self._scopes.popitem(last=False)
+            return dict(scope)
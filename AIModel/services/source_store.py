@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.rag_config import RAGConfig
+
+logger = logging.getLogger(__name__)
+
+
+class SourceTextStore:
+    """
+    Keeps the extracted text of every ingested document on disk, so the
+    vector index can be rebuilt (new embedder, new chunking) without asking
+    admins to upload everything again.
+    """
+    def __init__(self, directory: str = RAGConfig.SOURCE_TEXT_DIRECTORY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, doc_id: str) -> Path:
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(doc_id))
+        return self.directory / f"{safe_id}.json"
+
+    def save(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        path = self._path(doc_id)
+        temp_path = path.with_suffix(".json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"doc_id": str(doc_id), "text": text, "metadata": metadata}, f)
+        os.replace(temp_path, path)
+
+    def load(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(doc_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read source text for {doc_id}: {e}")
+            return None
+
+    def delete(self, doc_id: str):
+        path = self._path(doc_id)
+        if path.exists():
+            path.unlink()
+
+    def list_doc_ids(self) -> List[str]:
+        doc_ids = []
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    doc_ids.append(json.load(f)["doc_id"])
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping unreadable source file {path.name}: {e}")
+        return doc_ids
+
+
+def source_fingerprint(stored: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Content hash of a stored document (text + metadata); changes when a doc_id is re-uploaded"""
+    if not stored:
+        return None
+    payload = json.dumps({"text": stored.get("text"), "metadata": stored.get("metadata")}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def merge_overlapping_chunks(chunks: List[str], max_overlap: int = 2 * RAGConfig.CHUNK_OVERLAP) -> str:
+    """
+    Rebuild a document's text from its ordered chunks by dropping the overlap
+    the splitter repeated at the start of each chunk.
+    """
+    if not chunks:
+        return ""
+
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        overlap = 0
+        for size in range(min(len(merged), len(chunk), max_overlap), 0, -1):
+            if merged.endswith(chunk[:size]):
+                overlap = size
+                break
+        if overlap:
+            merged += chunk[overlap:]
+        else:
+            merged += "\n" + chunk
+    return merged
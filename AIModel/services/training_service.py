@@ -1,18 +1,33 @@
 import asyncio
+import threading
 import requests
 import logging
 import json
 import os
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Union
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
 from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
 from langchain_community.vectorstores.utils import filter_complex_metadata
 
+from config.rag_config import RAGConfig
+from services.vector_stats import VectorStoreStats
+from services.collection_metadata import ensure_embedding_compatibility, probe_embedding_dimension
+from services.index_registry import IndexRegistry
+from services.source_store import SourceTextStore
+from services.lexical_index import BM25Index
+from services.collection_router import CollectionRouter
+from services.document_index import DocumentIndex
+from services.quantized_index import QuantizedIndex
+from services.retrieval_scope import UNTENANTED, tag_untenanted_chunks, tenant_scope
+from services.vector_projection import build_embeddings, embedding_key
+from services.vector_store import ReadWriteLock, VectorStoreService
+
 # ✅ FIX: Import the real LoRA trainer and config
 try:
     from services.lora_trainer import LoRATrainer
@@ -343,19 +358,134 @@ class IngestionService:
     """
     Handles the ingestion of documents into the RAG vector store.
     """
-    def __init__(self, embedding_function):
+    def __init__(self, embedding_function, vector_stats: Optional[VectorStoreStats] = None,
+                 index_registry: Optional[IndexRegistry] = None,
+                 source_store: Optional[SourceTextStore] = None,
+                 lexical_index: Optional[BM25Index] = None,
+                 collection_router: Optional[CollectionRouter] = None,
+                 document_index: Optional[DocumentIndex] = None,
+                 quantized_index: Optional[QuantizedIndex] = None,
+                 vector_service: Optional[VectorStoreService] = None):
         self.embedding_function = embedding_function
-        self.vectorstore = Chroma(
-            collection_name="company_data",
-            embedding_function=self.embedding_function,
-            persist_directory="./chroma_db"
-        )
+        # Share ModelManager's registry/counters when given, otherwise keep our own
+        self.index_registry = index_registry or IndexRegistry()
+        self._owns_stats = vector_stats is None
+        self.vector_stats = vector_stats or VectorStoreStats()
+        self.source_store = source_store or SourceTextStore()
+        # BM25 index kept in step with the collection (owned by ModelManager when shared)
+        self.lexical_index = lexical_index
+        # The process-wide vector-store client and handles (owned by ModelManager when shared)
+        self.vector_service = vector_service or VectorStoreService()
+        self.collection_router = collection_router or CollectionRouter(self.vector_service)
+        self.document_index = document_index  # Per-document centroids for hierarchical retrieval
+        self.quantized_index = quantized_index  # int8/fp16 vector copy, when quantization is enabled
+        self._vectorstore = None
+        self._index_version = None
+        # Same split as ModelManager: _open_lock serializes opens, _index_lock only guards the publish
+        self._open_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        # Ingests/deletes enter shared; an index migration enters exclusive for its final switch
+        self.ingest_gate = ReadWriteLock()
+        try:
+            self._open_active_index()
+        except Exception as e:
+            # Retried by the `vectorstore` property on the first ingest/delete
+            logger.warning(f"⚠️ Ingestion index not opened yet, will retry on first use: {e}")
         logger.info("✅ IngestionService initialized with ChromaDB")
 
-    async def ingest_document(self, file_path: str, doc_id: str):
+    @property
+    def vectorstore(self) -> VectorStore:
+        """The live collection (Chroma or numpy backend), re-opened after an index migration swap"""
+        if self._index_version != self.index_registry.version:
+            self._open_active_index()
+        return self._vectorstore
+
+    def _open_active_index(self, prepared: Optional[Dict[str, Any]] = None):
+        """Open the active index, or take over the handles ModelManager prepared for it (no re-open or probe)"""
+        with self._open_lock:
+            state = self.index_registry.active
+            if self._index_version == state["version"]:
+                return
+            if prepared is not None:
+                if self._owns_stats:
+                    self.vector_stats.adopt(prepared["vector_stats"])
+                with self._index_lock:
+                    self.embedding_function = prepared["embeddings"]
+                    self._vectorstore = prepared["vectorstore"]
+                    self._index_version = state["version"]
+                return
+            if state["embedding_model"] is None:
+                state = self.index_registry.resolve_embedding_model(
+                    self.vector_service.find_collection(state["collection_name"])
+                )
+            
+            model_key = embedding_key(state["embedding_model"], state.get("projection"))
+            embedding_function = self.embedding_function
+            if getattr(embedding_function, "model", None) != model_key:
+                # Wrapped with the stored projection so written vectors match the collection's width
+                embedding_function = build_embeddings(state["embedding_model"], state.get("projection"))
+            
+            vectorstore = self.vector_service.open(state["collection_name"], embedding_function, model_key)
+            # Never write vectors of a different model/width into the collection
+            ensure_embedding_compatibility(
+                vectorstore._collection,
+                model_key,
+                probe_embedding_dimension(embedding_function, model_key)
+            )
+            # Waiting for the write lock is safe here: nothing holding the read lock takes _open_lock
+            with self.vector_service.write():
+                tag_untenanted_chunks(vectorstore._collection)
+            if self._owns_stats:
+                self.vector_stats.reconcile(*self._with_shards(vectorstore._collection))
+            
+            with self._index_lock:
+                self.embedding_function = embedding_function
+                self._vectorstore = vectorstore
+                self._index_version = state["version"]
+
+    def _with_shards(self, collection: Any) -> List[Any]:
+        """The collection plus its tenant shards when sharding is enabled"""
+        if not RAGConfig.TENANT_SHARDING:
+            return [collection]
+        return [collection] + self.collection_router.shard_collections(collection.name)
+
+    def _vectorstore_for(self, tenant_id: Optional[str], create: bool = False) -> Optional[VectorStore]:
+        """The tenant's shard when sharding is enabled (created on first ingest), else the shared collection"""
+        vectorstore = self.vectorstore
+        if not RAGConfig.TENANT_SHARDING or not tenant_id:
+            return vectorstore
+        state = self.index_registry.active
+        model = embedding_key(state["embedding_model"], state.get("projection"))
+        return self.collection_router.get(
+            vectorstore._collection.name, tenant_id, self.embedding_function,
+            model, probe_embedding_dimension(self.embedding_function, model), create=create
+        )
+
+    def split_text(self, text: str, metadata: Dict[str, Any],
+                   chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[Document]:
+        """Split extracted text into chunks using the live (or given) chunking parameters"""
+        # Every chunk carries a tenant_id so untenanted retrieval can select its own chunks
+        metadata = {**metadata, "tenant_id": metadata.get("tenant_id") or UNTENANTED}
+        state = self.index_registry.active
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size or state["chunk_size"],
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else state["chunk_overlap"],
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
+        )
+        return text_splitter.split_documents([Document(page_content=text, metadata=metadata)])
+
+    async def ingest_document(self, file_path: str, doc_id: str, tenant_id: Optional[str] = None):
         """
         Loads, splits, and embeds a document, then adds it to the vector store.
+        Chunks are tagged with `tenant_id` (UNTENANTED when not given) for tenant-scoped retrieval.
+        Runs on a worker thread: extraction, embedding and the store write all block.
         """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._ingest_document, file_path, doc_id, tenant_id)
+
+    def _ingest_document(self, file_path: str, doc_id: str, tenant_id: Optional[str] = None):
         logger.info(f"🚀 Starting ingestion for file: {file_path}")
         
         try:
@@ -389,52 +519,88 @@ class IngestionService:
             
             logger.info(f"📄 Extracted {len(text_content)} characters from document")
             
-            # ✅ Create Document object
-            from langchain.schema import Document
-            document = Document(
-                page_content=text_content,
-                metadata={
-                    "doc_id": str(doc_id),
-                    "source_file": str(os.path.basename(file_path)),
-                    "ingested_at": datetime.now().isoformat()
-                }
-            )
-            
-            # ✅ Split into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            texts = text_splitter.split_documents([document])
-            
-            logger.info(f"✂️ Split document into {len(texts)} chunks.")
-            
-            # ✅ Add to vector store
-            count_before = self.vectorstore._collection.count()
-            self.vectorstore.add_documents(texts)
-            count_after = self.vectorstore._collection.count()
+            metadata = {
+                "doc_id": str(doc_id),
+                "source_file": str(os.path.basename(file_path)),
+                "ingested_at": datetime.now().isoformat(),
+                "tenant_id": tenant_scope(tenant_id)
+            }
             
-            logger.info(f"✅ Added {count_after - count_before} chunks to vector store")
+            # Shared with other ingests/deletes; an index migration holds it exclusively while it switches
+            with self.ingest_gate.read():
+                # ✅ Keep the source text so the index can be rebuilt without re-uploads
+                self.source_store.save(doc_id, text_content, metadata)
+            
+                # ✅ Split into chunks
+                texts = self.split_text(text_content, metadata)
+            
+                logger.info(f"✂️ Split document into {len(texts)} chunks.")
+            
+                # ✅ Embed outside the write lock so searches are only held off for the write itself
+                vectorstore = self._vectorstore_for(tenant_id, create=True)
+                embeddings = self.embedding_function.embed_documents([text.page_content for text in texts])
+                added_ids = [str(uuid.uuid4()) for _ in texts]
+                metadatas = [text.metadata for text in texts]
+            
+                # ✅ Only the vector-store write excludes searches; the side indexes have their own locks
+                with self.vector_service.write():
+                    vectorstore._collection.upsert(
+                        ids=added_ids, embeddings=embeddings, metadatas=metadatas,
+                        documents=[text.page_content for text in texts]
+                    )
+                self.vector_stats.record_ingest(doc_id, len(added_ids))
+                if self.lexical_index is not None:
+                    self.lexical_index.add_documents(added_ids, texts)
+                if self.document_index is not None and RAGConfig.HIERARCHICAL_RETRIEVAL:
+                    self.document_index.upsert(doc_id, vectorstore._collection.name, embeddings, metadata)
+                if self.quantized_index is not None:
+                    self.quantized_index.add(vectorstore._collection.name, added_ids, embeddings, metadatas)
+            
+            logger.info(f"✅ Added {len(added_ids)} chunks to vector store")
             
         except Exception as e:
             logger.error(f"❌ Document ingestion failed for {file_path}: {e}")
             raise
 
-    def delete_document_by_id(self, doc_id: str) -> bool:
+    async def adelete_document_by_id(self, doc_id: str, tenant_id: Optional[str] = None) -> bool:
+        """delete_document_by_id on a worker thread, for async callers"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.delete_document_by_id, doc_id, tenant_id)
+
+    def delete_document_by_id(self, doc_id: str, tenant_id: Optional[str] = None) -> bool:
         """Delete a document from the vector store by its ID"""
         try:
-            # Get documents with the specified doc_id
-            collection = self.vectorstore._collection
-            results = collection.get(where={"doc_id": doc_id})
-            
-            if not results or not results['ids']:
-                logger.warning(f"⚠️ No documents found with doc_id: {doc_id}")
-                return False
-            
-            # Delete all chunks with this doc_id
-            collection.delete(where={"doc_id": doc_id})
+            with self.ingest_gate.read():
+                if tenant_id is None:
+                    # The stored source metadata says which tenant shard holds the chunks
+                    stored = self.source_store.load(doc_id)
+                    tenant_id = (stored or {}).get("metadata", {}).get("tenant_id")
+                self.source_store.delete(doc_id)
+            
+                # Get documents with the specified doc_id
+                vectorstore = self._vectorstore_for(tenant_id)
+                if vectorstore is None:
+                    logger.warning(f"⚠️ No collection for tenant {tenant_id}, nothing to delete for doc_id: {doc_id}")
+                    return False
+                collection = vectorstore._collection
+                results = collection.get(where={"doc_id": doc_id})
+            
+                if not results or not results['ids']:
+                    logger.warning(f"⚠️ No documents found with doc_id: {doc_id}")
+                    return False
+            
+                # Side indexes first, so none of them points at chunks already gone from the store
+                if self.lexical_index is not None:
+                    self.lexical_index.remove_doc(doc_id)
+                if self.document_index is not None:
+                    self.document_index.delete(doc_id)
+                if self.quantized_index is not None:
+                    self.quantized_index.remove_doc(collection.name, doc_id)
+                
+                # Delete all chunks with this doc_id; only the store write excludes searches
+                with self.vector_service.write():
+                    collection.delete(where={"doc_id": doc_id})
+                self.vector_stats.record_delete(doc_id)
             
             logger.info(f"✅ Deleted {len(results['ids'])} chunks for doc_id: {doc_id}")
             return True
@@ -444,9 +610,9 @@ class IngestionService:
             return False
 
     def get_document_count(self) -> int:
-        """Get the total number of documents in the vector store"""
+        """Get the total number of chunks in the vector store"""
         try:
-            return self.vectorstore._collection.count()
+            return self.vector_stats.total_chunks
         except Exception as e:
             logger.error(f"❌ Failed to get document count: {e}")
             return 0
@@ -454,12 +620,13 @@ class IngestionService:
     def list_documents(self) -> List[Dict[str, Any]]:
         """List all documents in the vector store"""
         try:
-            collection = self.vectorstore._collection
-            results = collection.get(include=['metadatas'])
+            metadatas = []
+            for collection in self._with_shards(self.vectorstore._collection):
+                metadatas.extend(collection.get(include=['metadatas']).get('metadatas') or [])
             
             # Group by doc_id to get unique documents
             doc_info = {}
-            for metadata in results.get('metadatas', []):
+            for metadata in metadatas:
                 doc_id = metadata.get('doc_id', 'unknown')
                 if doc_id not in doc_info:
                     doc_info[doc_id] = {
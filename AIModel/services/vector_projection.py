@@ -0,0 +1,173 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+from config.rag_config import RAGConfig
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_KINDS = ("pca", "truncate")
+PROJECTION_DIRECTORY = os.path.join(RAGConfig.PERSIST_DIRECTORY, "projections")
+
+# Metadata keys recorded on a projected Chroma collection
+PROJECTION_KIND_KEY = "projection"
+PROJECTION_DIMENSION_KEY = "projection_dimension"
+
+
+class VectorProjection:
+    """
+    Linear map from full embeddings to `dimension` components: PCA fitted on the
+    collection's vectors, or plain truncation for Matryoshka-trained embedders.
+    Projected vectors are re-normalized so cosine search behaves as before.
+    """
+    def __init__(self, kind: str, dimension: int, mean: Optional[np.ndarray] = None,
+                 components: Optional[np.ndarray] = None):
+        if kind not in PROJECTION_KINDS:
+            raise ValueError(f"Unknown projection '{kind}' (expected one of {PROJECTION_KINDS})")
+        self.kind = kind
+        self.dimension = dimension
+        self.mean = mean
+        self.components = components  # (dimension, full_dimension) for PCA
+
+    @classmethod
+    def fit(cls, kind: str, dimension: int, vectors: Any) -> "VectorProjection":
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        if dimension >= matrix.shape[1]:
+            raise ValueError(f"Projection dimension {dimension} must be below the embedding width {matrix.shape[1]}")
+        if kind == "truncate":
+            return cls(kind, dimension)
+        if len(matrix) < dimension:
+            raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} vectors, got {len(matrix)}")
+
+        mean = matrix.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(matrix - mean, full_matrices=False)
+        explained = float((singular_values[:dimension] ** 2).sum() / (singular_values ** 2).sum())
+        logger.info(f"📉 [PROJECTION] PCA {matrix.shape[1]} -> {dimension} keeps {explained:.1%} of the variance")
+        return cls(kind, dimension, mean.astype(np.float32), vt[:dimension].astype(np.float32))
+
+    def apply(self, vectors: Any) -> np.ndarray:
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.kind == "truncate":
+            projected = matrix[:, :self.dimension]
+        else:
+            projected = (matrix - self.mean) @ self.components.T
+        return _normalize(projected)
+
+    @property
+    def key(self) -> str:
+        """Suffix identifying this projection in embedding-model names (e.g. "+pca256")"""
+        return f"+{self.kind}{self.dimension}"
+
+    def save(self, collection_name: str) -> str:
+        Path(PROJECTION_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        path = os.path.join(PROJECTION_DIRECTORY, f"{collection_name}.npz")
+        arrays = {"kind": np.array(self.kind), "dimension": np.array(self.dimension)}
+        if self.kind == "pca":
+            arrays.update(mean=self.mean, components=self.components)
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "VectorProjection":
+        with np.load(path) as data:
+            kind = str(data["kind"])
+            return cls(
+                kind, int(data["dimension"]),
+                data["mean"] if kind == "pca" else None,
+                data["components"] if kind == "pca" else None
+            )
+
+    def describe(self, path: Optional[str] = None) -> Dict[str, Any]:
+        return {"kind": self.kind, "dimension": self.dimension, "path": path}
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ProjectedEmbeddings(Embeddings):
+    """Embeddings wrapper applying a VectorProjection on both the write and query paths"""
+    def __init__(self, embeddings: Embeddings, projection: VectorProjection):
+        self.embeddings = embeddings
+        self.projection = projection
+        self.model = f"{getattr(embeddings, 'model', 'unknown')}{projection.key}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.projection.apply(self.embeddings.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.projection.apply([self.embeddings.embed_query(text)])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.projection.apply(await self.embeddings.aembed_documents(texts)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.projection.apply([await self.embeddings.aembed_query(text)])[0].tolist()
+
+
+def build_embeddings(embedding_model: str, projection: Optional[Dict[str, Any]] = None) -> Embeddings:
+    """Ollama embeddings for `embedding_model`, wrapped with the stored projection if any"""
+    embeddings = OllamaEmbeddings(model=embedding_model)
+    if projection and projection.get("path"):
+        return ProjectedEmbeddings(embeddings, VectorProjection.load(projection["path"]))
+    return embeddings
+
+
+def embedding_key(embedding_model: str, projection: Optional[Dict[str, Any]] = None) -> str:
+    """Identity of the vectors in a collection: the model name plus its projection, if any"""
+    if projection:
+        return f"{embedding_model}+{projection['kind']}{projection['dimension']}"
+    return embedding_model
+
+
+def recall_report(vectors: Any, dimensions: List[int], kind: str = "pca", k: int = 10,
+                  sample: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Recall@k of nearest-neighbour search after projecting to each dimension,
+    measured against exact full-width cosine search, using `sample` stored
+    chunks as queries. Helps pick the smallest dimension that keeps recall.
+    """
+    matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+    count, full_dimension = matrix.shape
+    k = min(k, count - 1)
+    if k < 1:
+        raise ValueError("Need at least two vectors for a recall report")
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(count, size=min(sample, count), replace=False)
+
+    def neighbours(space: np.ndarray) -> np.ndarray:
+        scores = space[queries] @ space.T
+        scores[np.arange(len(queries)), queries] = -np.inf  # A chunk is not its own neighbour
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    exact = neighbours(matrix)
+    dimensions = sorted(dimension for dimension in set(dimensions) if dimension < full_dimension)
+    # One PCA fit at the largest dimension; smaller ones are its leading components
+    widest = VectorProjection.fit(kind, dimensions[-1], matrix) if dimensions else None
+    rows = []
+    for dimension in dimensions:
+        projection = VectorProjection(
+            kind, dimension, widest.mean, widest.components[:dimension] if kind == "pca" else None
+        )
+        approximate = neighbours(projection.apply(matrix))
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(exact, approximate)])
+        rows.append({
+            "dimension": dimension,
+            f"recall_at_{k}": round(float(recall), 4),
+            "bytes_per_vector_float32": dimension * 4
+        })
+    return {
+        "kind": kind,
+        "vectors": count,
+        "full_dimension": full_dimension,
+        "queries": len(queries),
+        "k": k,
+        "results": rows
+    }
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreStats:
+    """
+    Chunk and document counters for the RAG collection, kept in process.
+    Ingest and delete update them incrementally; `reconcile` re-reads the
+    collection metadata periodically to correct any drift. This keeps
+    `collection.count()` (a SQLite round trip) off the query hot path.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks_by_doc: Dict[str, int] = {}
+        self._reconciled_at: Optional[float] = None
+        self._last_reconciled_iso: Optional[str] = None
+
+    @property
+    def is_reconciled(self) -> bool:
+        return self._reconciled_at is not None
+
+    @property
+    def total_chunks(self) -> int:
+        with self._lock:
+            return sum(self._chunks_by_doc.values())
+
+    @property
+    def document_count(self) -> int:
+        with self._lock:
+            return len(self._chunks_by_doc)
+
+    def get_chunk_count(self, doc_id: str) -> int:
+        with self._lock:
+            return self._chunks_by_doc.get(str(doc_id), 0)
+
+    def get_doc_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._chunks_by_doc.keys())
+
+    def record_ingest(self, doc_id: str, chunk_count: int):
+        with self._lock:
+            doc_id = str(doc_id)
+            self._chunks_by_doc[doc_id] = self._chunks_by_doc.get(doc_id, 0) + chunk_count
+
+    def record_delete(self, doc_id: str) -> int:
+        """Forget a document; returns the number of chunks it had"""
+        with self._lock:
+            return self._chunks_by_doc.pop(str(doc_id), 0)
+
+    def reconcile(self, *collections: Any):
+        """Rebuild the counters from the chunk metadata of the collection (and its tenant shards)"""
+        chunks_by_doc: Dict[str, int] = {}
+        for collection in collections:
+            results = collection.get(include=["metadatas"])
+            for metadata in results.get("metadatas") or []:
+                doc_id = str((metadata or {}).get("doc_id", "unknown"))
+                chunks_by_doc[doc_id] = chunks_by_doc.get(doc_id, 0) + 1
+
+        with self._lock:
+            drift = sum(chunks_by_doc.values()) - sum(self._chunks_by_doc.values())
+            self._chunks_by_doc = chunks_by_doc
+            self._reconciled_at = time.monotonic()
+            self._last_reconciled_iso = datetime.now().isoformat()
+
+        if drift:
+            logger.info(f"🔄 [STATS] Reconciled vector stats (drift {drift:+d} chunks)")
+        logger.info(f"📊 [STATS] {sum(chunks_by_doc.values())} chunks across {len(chunks_by_doc)} documents")
+
+    def adopt(self, other: "VectorStoreStats"):
+        """Take over the counters of stats reconciled off to the side (O(1) swap)"""
+        with other._lock:
+            state = (dict(other._chunks_by_doc), other._reconciled_at, other._last_reconciled_iso)
+        with self._lock:
+            self._chunks_by_doc, self._reconciled_at, self._last_reconciled_iso = state
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_chunks": sum(self._chunks_by_doc.values()),
+                "document_count": len(self._chunks_by_doc),
+                "reconciled": self._reconciled_at is not None,
+                "last_reconciled_at": self._last_reconciled_iso
+            }
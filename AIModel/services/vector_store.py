@@ -0,0 +1,654 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import chromadb
+import numpy as np
+from langchain.schema import Document
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config.rag_config import RAGConfig
+from services.collection_metadata import hnsw_metadata
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "numpy")
+SEARCH_BLOCK_ROWS = 8192
+# Numpy backend: compact a collection once this fraction of its rows are tombstones
+COMPACTION_RATIO = 0.25
+
+# Metadata keys with a per-row code array, so filtering on them is a vectorized bitmap
+_CODED_KEYS = ("doc_id", "tenant_id")
+# Collection metadata key: "int8" stores the vectors as int8 codes with a per-row scale instead of float16
+QUANTIZATION_KEY = "quantization"
+
+
+class MemmapCollection:
+    """
+    In-process collection for small corpora (up to ~100k chunks): unit vectors in a
+    contiguous float16 matrix, memory-mapped from "{directory}/vectors.{generation}.f16",
+    searched exactly by brute-force cosine. Ids, texts and metadata live in the
+    append-only row log "rows.{generation}.jsonl"; deletes are tombstone records and
+    the files are compacted into a new generation once too many rows are dead.
+    "collection.json" is the manifest (metadata, committed row count and log length),
+    written last on every change, so an interrupted write is rolled back on load.
+    With "quantization": "int8" in the metadata, the vectors are stored as int8 codes
+    instead ("vectors.{generation}.i8", per-row scales in "scales.{generation}.f32"),
+    d + 4 bytes per row rather than 2d; queries and `get` see the dequantized rows.
+    Implements the subset of the chromadb Collection API the RAG services use
+    (count/peek/get/query/add/upsert/update/delete/modify), including `where` filters.
+    """
+    def __init__(self, name: str, directory: Path, metadata: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.directory = directory
+        self._manifest_path = directory / "collection.json"
+        self._lock = threading.RLock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._manifest_path.exists():
+            with open(self._manifest_path, "r") as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"metadata": dict(metadata or {}), "generation": 0, "dimension": None, "rows": 0, "log_bytes": 0}
+        self.metadata = manifest["metadata"]
+        self.quantization = self.metadata.get(QUANTIZATION_KEY)
+        self._generation = manifest["generation"]
+        self._dimension: Optional[int] = manifest["dimension"]
+        self._load(manifest["rows"], manifest["log_bytes"])
+
+    def _log_path(self, generation: Optional[int] = None) -> Path:
+        return self.directory / f"rows.{self._generation if generation is None else generation}.jsonl"
+
+    def _vector_files(self, generation: Optional[int] = None) -> List[Any]:
+        """(path, dtype, values per row) of every fixed-offset row file of a generation"""
+        generation = self._generation if generation is None else generation
+        if self.quantization == "int8":
+            return [
+                (self.directory / f"vectors.{generation}.i8", np.int8, self._dimension),
+                (self.directory / f"scales.{generation}.f32", np.float32, 1)
+            ]
+        return [(self.directory / f"vectors.{generation}.f16", np.float16, self._dimension)]
+
+    def _load(self, committed_rows: int, committed_log_bytes: int):
+        """Replay the row log up to the manifest, dropping uncommitted tails and repairing a short file"""
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        dead: List[int] = []
+        log_path = self._log_path()
+        log_data = b""
+        if log_path.exists():
+            with open(log_path, "r+b") as f:
+                log_data = f.read(committed_log_bytes)
+                if os.fstat(f.fileno()).st_size > committed_log_bytes:
+                    f.truncate(committed_log_bytes)
+        self._log_bytes = len(log_data)
+        for line in log_data.splitlines():
+            record = json.loads(line)
+            if "id" in record:
+                self._ids.append(record["id"])
+                self._documents.append(record["document"])
+                self._metadatas.append(record["metadata"])
+            elif "delete" in record:
+                dead.extend(record["delete"])
+            elif record["update"] < len(self._metadatas):
+                self._metadatas[record["update"]] = record["metadata"]
+
+        vector_rows = 0
+        if self._dimension:
+            vector_rows = committed_rows
+            for path, dtype, width in self._vector_files():
+                row_bytes = np.dtype(dtype).itemsize * width
+                size = 0
+                if path.exists():
+                    with open(path, "r+b") as f:
+                        size = os.fstat(f.fileno()).st_size
+                        if size > committed_rows * row_bytes:
+                            # Vectors appended after the last manifest write (interrupted add)
+                            f.truncate(committed_rows * row_bytes)
+                vector_rows = min(vector_rows, size // row_bytes)
+
+        # Rows, log and vectors must agree; anything else is a damaged file, cut to the common prefix
+        consistent = min(committed_rows, len(self._ids), vector_rows)
+        repair = consistent != committed_rows or consistent != len(self._ids)
+        if repair:
+            logger.warning(
+                f"⚠️ [NUMPY STORE] {self.name}: manifest has {committed_rows} rows, log {len(self._ids)}, "
+                f"vectors {vector_rows}; keeping the first {consistent}"
+            )
+            del self._ids[consistent:], self._documents[consistent:], self._metadatas[consistent:]
+
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._live[[row for row in dead if row < len(self._ids)]] = False
+        self._positions = {self._ids[index]: index for index in np.flatnonzero(self._live)}
+        self._vocabularies: Dict[str, Dict[Any, int]] = {key: {} for key in _CODED_KEYS}
+        self._codes = {
+            key: np.fromiter(
+                (self._code(key, metadata.get(key)) for metadata in self._metadatas),
+                dtype=np.int32, count=len(self._metadatas)
+            )
+            for key in _CODED_KEYS
+        }
+        self._map()
+        self._remove_stale_generations()
+        if repair:
+            self._compact()
+        elif not self._manifest_path.exists():
+            self._save_manifest()
+
+    def _map(self):
+        """Memory-map the row files: `_sources` in _vector_files order (float16 rows, or int8 codes and scales)"""
+        if not self._ids or not self._dimension:
+            self._sources = [np.zeros((0, width or 0), dtype=dtype) for _, dtype, width in self._vector_files()]
+        else:
+            self._sources = [
+                np.memmap(path, dtype=dtype, mode="r", shape=(len(self._ids), width))
+                for path, dtype, width in self._vector_files()
+            ]
+
+    def _vectors(self, rows: Any) -> np.ndarray:
+        """float32 unit vectors of a row slice or index array (int8 codes dequantized)"""
+        if self.quantization == "int8":
+            codes, scales = self._sources
+            return codes[rows].astype(np.float32) * scales[rows].astype(np.float32)
+        return self._sources[0][rows].astype(np.float32)
+
+    def _remove_stale_generations(self):
+        """Files of other generations: left behind by a compaction interrupted before or after its manifest write"""
+        current = {self._log_path().name} | {path.name for path, _, _ in self._vector_files()}
+        for pattern in ("vectors.*.f16", "vectors.*.i8", "scales.*.f32", "rows.*.jsonl"):
+            for path in self.directory.glob(pattern):
+                if path.name not in current:
+                    path.unlink()
+
+    def _code(self, key: str, value: Any) -> int:
+        vocabulary = self._vocabularies[key]
+        value = None if value is None else str(value)
+        if value not in vocabulary:
+            vocabulary[value] = len(vocabulary)
+        return vocabulary[value]
+
+    @staticmethod
+    def _write_at(path: Path, offset: int, payload: bytes):
+        """Write at the committed end of a file (discarding any uncommitted tail) and sync it"""
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_log(self, records: List[Dict[str, Any]]):
+        payload = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        self._write_at(self._log_path(), self._log_bytes, payload)
+        self._log_bytes += len(payload)
+
+    def _save_manifest(self):
+        temp_path = self._manifest_path.with_name(f"{self._manifest_path.name}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "metadata": self.metadata, "generation": self._generation, "dimension": self._dimension,
+                "rows": len(self._ids), "log_bytes": self._log_bytes
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._manifest_path)
+
+    def _commit(self):
+        """Publish the appended vectors and log records, then compact if too many rows are dead"""
+        self._save_manifest()
+        dead = len(self._ids) - len(self._positions)
+        if dead and dead >= COMPACTION_RATIO * len(self._ids):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the live rows into a new generation; the manifest switch makes it take effect"""
+        live = np.flatnonzero(self._live)
+        generation = self._generation + 1
+        if self._dimension:
+            for source, (path, _, _) in zip(self._sources, self._vector_files(generation)):
+                with open(path, "wb") as f:
+                    for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                        f.write(np.ascontiguousarray(source[live[start:start + SEARCH_BLOCK_ROWS]]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+        self._ids = [self._ids[index] for index in live]
+        self._documents = [self._documents[index] for index in live]
+        self._metadatas = [self._metadatas[index] for index in live]
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._positions = {chunk_id: index for index, chunk_id in enumerate(self._ids)}
+        for key in _CODED_KEYS:
+            self._codes[key] = self._codes[key][live]
+
+        self._sources = []  # Release the old mappings before their files are removed
+        self._generation = generation
+        self._log_bytes = 0
+        self._write_log([
+            {"id": chunk_id, "document": document, "metadata": metadata}
+            for chunk_id, document, metadata in zip(self._ids, self._documents, self._metadatas)
+        ])
+        self._save_manifest()
+        self._remove_stale_generations()
+        self._map()
+        logger.info(f"🧹 [NUMPY STORE] Compacted {self.name} to {len(self._ids)} rows")
+
+    def count(self) -> int:
+        return len(self._positions)
+
+    def modify(self, name: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        if name is not None and name != self.name:
+            raise ValueError("Renaming is not supported by the numpy vector backend")
+        if metadata is not None:
+            with self._lock:
+                self.metadata = dict(metadata)
+                self._save_manifest()
+
+    def peek(self, limit: int = 10) -> Dict[str, Any]:
+        return self.get(limit=limit, include=["embeddings", "documents", "metadatas"])
+
+    def add(self, ids: List[str], embeddings: Optional[List[Any]] = None,
+            metadatas: Optional[List[Dict[str, Any]]] = None, documents: Optional[List[str]] = None):
+        """Append new rows; ids that already exist are skipped (as Chroma does)"""
+        with self._lock:
+            fresh = [index for index, chunk_id in enumerate(ids) if chunk_id not in self._positions]
+            if len(fresh) < len(ids):
+                logger.warning(f"⚠️ [NUMPY STORE] Skipped {len(ids) - len(fresh)} existing ids in {self.name}")
+            self._append(
+                [ids[index] for index in fresh],
+                [embeddings[index] for index in fresh] if embeddings is not None else None,
+                [metadatas[index] for index in fresh] if metadatas else None,
+                [documents[index] for index in fresh] if documents else None
+            )
+            self._commit()
+
+    def upsert(self, ids: List[str], embeddings: Optional[List[Any]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None, documents: Optional[List[str]] = None):
+        with self._lock:
+            # Tombstones and new rows are published by the same manifest write
+            self._remove([self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions])
+            self._append(ids, embeddings, metadatas, documents)
+            self._commit()
+
+    def _append(self, ids: List[str], embeddings: Optional[List[Any]],
+                metadatas: Optional[List[Dict[str, Any]]], documents: Optional[List[str]]):
+        if len(ids) == 0:
+            return
+        if embeddings is None:
+            raise ValueError("The numpy vector backend needs explicit embeddings")
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self._dimension is None:
+            self._dimension = int(vectors.shape[1])
+        elif vectors.shape[1] != self._dimension:
+            raise ValueError(f"Collection '{self.name}' holds {self._dimension}-d vectors, got {vectors.shape[1]}-d")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        metadatas = [dict(metadata or {}) for metadata in (metadatas or [{}] * len(ids))]
+        documents = list(documents or [None] * len(ids))
+        vectors /= norms
+        if self.quantization == "int8":
+            peaks = np.abs(vectors).max(axis=1)
+            peaks[peaks == 0] = 1.0
+            scales = (peaks / 127.0).astype(np.float32)
+            rows = [np.round(vectors / scales[:, None]).astype(np.int8), scales[:, None]]
+        else:
+            rows = [vectors.astype(np.float16)]
+        for values, (path, dtype, width) in zip(rows, self._vector_files()):
+            self._write_at(path, len(self._ids) * np.dtype(dtype).itemsize * width, values.tobytes())
+        self._write_log([
+            {"id": chunk_id, "document": document, "metadata": metadata}
+            for chunk_id, document, metadata in zip(ids, documents, metadatas)
+        ])
+        for chunk_id in ids:
+            self._positions[chunk_id] = len(self._ids)
+            self._ids.append(chunk_id)
+        self._documents.extend(documents)
+        self._metadatas.extend(metadatas)
+        self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+        for key in _CODED_KEYS:
+            codes = np.fromiter((self._code(key, metadata.get(key)) for metadata in metadatas), dtype=np.int32)
+            self._codes[key] = np.concatenate([self._codes[key], codes])
+        self._map()
+
+    def update(self, ids: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Replace the metadata of existing rows (vectors and texts are unchanged)"""
+        if metadatas is None:
+            return
+        with self._lock:
+            records = []
+            for chunk_id, metadata in zip(ids, metadatas):
+                index = self._positions.get(chunk_id)
+                if index is None:
+                    continue
+                self._metadatas[index] = dict(metadata or {})
+                for key in _CODED_KEYS:
+                    self._codes[key][index] = self._code(key, self._metadatas[index].get(key))
+                records.append({"update": int(index), "metadata": self._metadatas[index]})
+            if records:
+                self._write_log(records)
+                self._commit()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self._remove(self._select(ids, where).tolist())
+            self._commit()
+
+    def _remove(self, indices: List[int]):
+        """Tombstone rows; their space is reclaimed by the next compaction"""
+        if not indices:
+            return
+        self._write_log([{"delete": [int(index) for index in indices]}])
+        self._live[indices] = False
+        for index in indices:
+            self._positions.pop(self._ids[index], None)
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Bitmap of the rows matching a Chroma `where` clause ($and/$or, $eq/$ne/$in/$nin)"""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in (where or {}).items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self._mask(clause) for clause in condition])
+            else:
+                operator, operand = next(iter(condition.items())) if isinstance(condition, dict) else ("$eq", condition)
+                if operator not in ("$eq", "$ne", "$in", "$nin"):
+                    raise ValueError(f"Unsupported where operator for the numpy vector backend: {operator}")
+                values = operand if operator in ("$in", "$nin") else [operand]
+                matches = self._matches(key, values)
+                mask &= ~matches if operator in ("$ne", "$nin") else matches
+        return mask
+
+    def _matches(self, key: str, values: List[Any]) -> np.ndarray:
+        if key in _CODED_KEYS:
+            vocabulary = self._vocabularies[key]
+            wanted = [vocabulary[str(value)] for value in values if str(value) in vocabulary]
+            return np.isin(self._codes[key], wanted)
+        return np.fromiter(
+            (metadata.get(key) in values for metadata in self._metadatas), dtype=bool, count=len(self._metadatas)
+        )
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Row indices of live rows for the given ids (in that order) and/or where clause"""
+        mask = self._mask(where) & self._live
+        if ids is None:
+            return np.flatnonzero(mask)
+        rows = [self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions]
+        return np.asarray([row for row in rows if mask[row]], dtype=np.int64)
+
+    def _rows(self, indices: Iterable[int], include: List[str]) -> Dict[str, Any]:
+        indices = list(indices)
+        return {
+            "ids": [self._ids[index] for index in indices],
+            "embeddings": self._vectors(indices) if "embeddings" in include else None,
+            "documents": [self._documents[index] for index in indices] if "documents" in include else None,
+            "metadatas": [self._metadatas[index] for index in indices] if "metadatas" in include else None
+        }
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        with self._lock:
+            indices = self._select(ids, where)
+            start = offset or 0
+            indices = indices[start:start + limit] if limit is not None else indices[start:]
+            return self._rows(indices, include if include is not None else ["documents", "metadatas"])
+
+    def query(self, query_embeddings: List[Any], n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Top-n by cosine similarity for each query, restricted by `where`: exact over the
+        stored rows (for int8 collections, over the dequantized codes)
+        """
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries /= norms
+
+        results: Dict[str, Any] = {"ids": [], "embeddings": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            mask = self._mask(where) & self._live
+            k = min(n_results, int(mask.sum()))
+            # Score in blocks so the float32 up-cast never covers the whole matrix
+            scores = np.empty((len(queries), len(self._ids)), dtype=np.float32)
+            for start in range(0, len(self._ids), SEARCH_BLOCK_ROWS):
+                block = self._vectors(slice(start, start + SEARCH_BLOCK_ROWS))
+                scores[:, start:start + len(block)] = queries @ block.T
+            scores[:, ~mask] = -np.inf
+
+            for row_scores in scores:
+                top = np.argpartition(-row_scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+                top = top[np.argsort(-row_scores[top])]
+                top_scores = row_scores[top]
+                rows = self._rows(top, include)
+                for key in ("ids", "embeddings", "documents", "metadatas"):
+                    results[key].append(rows[key])
+                # Chroma's cosine space reports distance = 1 - similarity
+                results["distances"].append((1.0 - top_scores).tolist() if "distances" in include else None)
+        return results
+
+
+class MemmapClient:
+    """chromadb-client-like registry of MemmapCollections under one directory"""
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._collections: Dict[str, MemmapCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None,
+                                 **kwargs: Any) -> MemmapCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemmapCollection(name, self.path / name, metadata)
+            return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs: Any) -> MemmapCollection:
+        if name not in self._collections and not (self.path / name / "collection.json").exists():
+            raise ValueError(f"Collection {name} does not exist.")
+        return self.get_or_create_collection(name)
+
+    def list_collections(self) -> List[str]:
+        if not self.path.exists():
+            return []
+        return sorted(entry.name for entry in self.path.iterdir() if (entry / "collection.json").exists())
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+            shutil.rmtree(self.path / name, ignore_errors=True)
+
+
+_memmap_clients: Dict[str, MemmapClient] = {}
+_memmap_clients_lock = threading.Lock()
+
+
+def create_client(persist_directory: str = RAGConfig.PERSIST_DIRECTORY) -> Any:
+    """
+    Client of the configured backend (RAG_VECTOR_BACKEND). Numpy clients are shared
+    per directory so every service sees the same in-memory rows.
+    """
+    if RAGConfig.VECTOR_BACKEND != "numpy":
+        return chromadb.PersistentClient(path=persist_directory)
+    path = os.path.abspath(os.path.join(persist_directory, "numpy"))
+    with _memmap_clients_lock:
+        if path not in _memmap_clients:
+            _memmap_clients[path] = MemmapClient(path)
+        return _memmap_clients[path]
+
+
+class NumpyVectorStore(VectorStore):
+    """LangChain vector store over a MemmapCollection (the "numpy" backend)"""
+    def __init__(self, collection_name: str, embedding_function: Embeddings, client: Optional[MemmapClient] = None,
+                 collection_metadata: Optional[Dict[str, Any]] = None):
+        self._client = client or create_client()
+        self._embedding_function = embedding_function
+        self._collection = self._client.get_or_create_collection(collection_name, metadata=collection_metadata)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = [chunk_id or str(uuid.uuid4()) for chunk_id in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        embeddings = self._embedding_function.embed_documents(texts)
+        self._collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+        return ids
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        results = self._collection.query(
+            query_embeddings=[self._embedding_function.embed_query(query)],
+            n_results=k, where=filter, include=["documents", "metadatas"]
+        )
+        return [
+            Document(page_content=text or "", metadata=metadata or {})
+            for text, metadata in zip(results["documents"][0], results["metadatas"][0])
+        ]
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._collection.delete(ids=ids)
+
+    def delete_collection(self):
+        self._client.delete_collection(self._collection.name)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict[str, Any]]] = None,
+                   collection_name: str = RAGConfig.COLLECTION_NAME, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(collection_name, embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+
+def open_vector_store(collection_name: str, embedding_function: Embeddings, client: Any = None,
+                      collection_metadata: Optional[Dict[str, Any]] = None) -> VectorStore:
+    """
+    Open (creating if needed) a collection on the configured backend. Chroma is the
+    default; both expose the raw collection as `._collection` with the same API.
+    New Chroma collections get the RAG_HNSW_* parameters unless the metadata sets them;
+    new numpy collections are stored int8-quantized when RAG_VECTOR_QUANTIZATION=int8.
+    """
+    if RAGConfig.VECTOR_BACKEND == "numpy":
+        if RAGConfig.VECTOR_QUANTIZATION == "int8":
+            # Only applies to new collections: the storage format is fixed at creation
+            collection_metadata = {QUANTIZATION_KEY: "int8", **(collection_metadata or {})}
+        return NumpyVectorStore(collection_name, embedding_function, client, collection_metadata)
+    client = client or create_client()
+    if not _collection_exists(client, collection_name):
+        # HNSW parameters can only be chosen at creation; existing metadata is left alone
+        collection_metadata = {**hnsw_metadata(), **(collection_metadata or {})}
+    return Chroma(
+        collection_name=collection_name, embedding_function=embedding_function,
+        client=client, collection_metadata=collection_metadata
+    )
+
+
+def _collection_exists(client: Any, collection_name: str) -> bool:
+    try:
+        client.get_collection(collection_name)
+        return True
+    except Exception:
+        return False
+
+
+class ReadWriteLock:
+    """Any number of readers or a single writer; a waiting writer holds off new readers"""
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class VectorStoreService:
+    """
+    Process-wide owner of the vector-store client. ModelManager, IngestionService,
+    the shard router and the index migration all go through this one client (one
+    SQLite connection and HNSW cache for Chroma) and share one handle per
+    collection, so readers never see a stale copy of what a writer just added.
+    Searches run under `read()`; chunk writes and deletes under `write()`.
+    """
+    def __init__(self, persist_directory: str = RAGConfig.PERSIST_DIRECTORY):
+        self.persist_directory = persist_directory
+        self._client = None
+        self._handles: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._rw_lock = ReadWriteLock()
+
+    @property
+    def client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = create_client(self.persist_directory)
+                logger.info(f"✅ Vector store client opened ({RAGConfig.VECTOR_BACKEND}): {self.persist_directory}")
+            return self._client
+
+    def open(self, collection_name: str, embedding_function: Embeddings, embedding_model: str,
+             collection_metadata: Optional[Dict[str, Any]] = None) -> VectorStore:
+        """The shared handle for a collection; re-opened only when the embedding model changes"""
+        with self._lock:
+            entry = self._handles.get(collection_name)
+        if entry is not None and entry["embedding_model"] == embedding_model:
+            return entry["handle"]
+        handle = open_vector_store(collection_name, embedding_function, self.client, collection_metadata)
+        with self._lock:
+            self._handles[collection_name] = {"handle": handle, "embedding_model": embedding_model}
+        return handle
+
+    def find_collection(self, collection_name: str) -> Optional[Any]:
+        """The raw collection if it exists (never creates it)"""
+        try:
+            return self.client.get_collection(collection_name)
+        except Exception:
+            return None
+
+    def delete_collection(self, collection_name: str):
+        with self.write():
+            with self._lock:
+                self._handles.pop(collection_name, None)
+            self.client.delete_collection(collection_name)
+
+    def read(self):
+        return self._rw_lock.read()
+
+    def write(self):
+        return self._rw_lock.write()